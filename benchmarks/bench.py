@@ -0,0 +1,236 @@
+"""
+Micro-benchmarks for public/engine.py over a fixed corpus of positions.
+
+    python benchmarks/bench.py run [-o results.json]
+    python benchmarks/bench.py compare [results.json] [--baseline benchmarks/baseline.json]
+    python benchmarks/bench.py memory [-n 1000]
+
+``run`` measures each operation on every position in positions.json and
+writes the results as JSON. ``compare`` flags every metric that is more than
+``--threshold`` worse than the baseline and exits with status 1 if any are.
+``memory`` prints the bytes allocated per board copy and per move.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+TESTDATA_DIR = os.path.join(ROOT_DIR, "src", "game", "tests", "testdata")
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "public"))
+
+import engine  # noqa: E402
+
+# higher is better for rates, lower is better for latencies
+HIGHER_IS_BETTER = {
+    "movegen_per_sec": True,
+    "push_pop_per_sec": True,
+    "copy_per_sec": True,
+    "serialize_roundtrip_per_sec": True,
+    "evaluate_per_sec": True,
+    "value_player_ms": False,
+    "import_ms": False,
+}
+
+IMPORT_SCRIPT = (
+    "import sys, time; sys.path.insert(0, sys.argv[1]); "
+    "start = time.perf_counter(); import engine; print((time.perf_counter() - start) * 1000)"
+)
+
+
+def load_positions(path: str = os.path.join(BENCHMARKS_DIR, "positions.json")) -> List[dict]:
+    with open(path) as f:
+        positions = json.load(f)
+
+    for position in positions:
+        moves: List[str] = []
+        if "game" in position:
+            with open(os.path.join(TESTDATA_DIR, position["game"])) as f:
+                moves = json.load(f)[:position["ply"]]
+        board = engine.BaseBoard(engine.STARTING_FEN if position.get("fen", "startpos") == "startpos" else position["fen"])
+        for uci in moves:
+            board.push(engine.Move.from_uci(uci))
+        board.move_stack = []
+        board._stack = []
+        position["board"] = board
+    return positions
+
+
+def rate(func: Callable[[], object], min_time: float, repeat: int = 3) -> float:
+    """Returns the best of *repeat* measurements of calls per second."""
+    best = 0.0
+    for _ in range(repeat):
+        n = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            func()
+            n += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, n / elapsed)
+    return best
+
+
+def bench_position(board: "engine.BaseBoard", min_time: float) -> Dict[str, float]:
+    moves = list(board.generate_legal_moves())
+
+    def push_pop() -> None:
+        for move in moves:
+            board.push(move)
+            board.pop()
+
+    def serialize_roundtrip() -> None:
+        engine.clear_board_cache()
+        engine.BaseBoard.deserialize(board.serialize())
+
+    def value_player() -> None:
+        engine.ValuePlayer(board).get_next_move()
+
+    return {
+        "movegen_per_sec": rate(lambda: list(board.generate_legal_moves()), min_time),
+        "push_pop_per_sec": rate(push_pop, min_time) * len(moves),
+        "copy_per_sec": rate(board.copy, min_time),
+        "serialize_roundtrip_per_sec": rate(serialize_roundtrip, min_time),
+        "evaluate_per_sec": rate(lambda: engine.evaluate_board(board), min_time),
+        "value_player_ms": 1000 / rate(value_player, min_time, repeat=1),
+    }
+
+
+def import_time(repeat: int = 5) -> float:
+    """Returns the best time in milliseconds to import the engine in a fresh interpreter."""
+    # bytecode is cached by the first import, the browser also loads a cached module
+    times = []
+    for _ in range(repeat + 1):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT, os.path.join(ROOT_DIR, "public")],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        times.append(float(output))
+    return min(times[1:])
+
+
+def memory_usage(board: "engine.BaseBoard", n: int = 1000) -> Dict[str, float]:
+    """Measures the bytes allocated per board copy and per generated move."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        boards = [board.copy() for _ in range(n)]
+        board_bytes = (tracemalloc.get_traced_memory()[0] - before) / n
+        del boards
+
+        before = tracemalloc.get_traced_memory()[0]
+        moves = [move for _ in range(max(1, n // 100)) for move in board.generate_legal_moves()]
+        move_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(moves)
+        del moves
+
+        before = tracemalloc.get_traced_memory()[0]
+        packed = [board.generate_legal_moves_packed() for _ in range(max(1, n // 100))]
+        packed_bytes = (tracemalloc.get_traced_memory()[0] - before) / sum(len(p) for p in packed)
+        del packed
+    finally:
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(n):
+        board.copy()
+    copy_us = (time.perf_counter() - start) / n * 1e6
+
+    return {"board_bytes": board_bytes, "move_bytes": move_bytes, "packed_move_bytes": packed_bytes, "copy_us": copy_us}
+
+
+def run(min_time: float) -> dict:
+    results: Dict[str, Dict[str, float]] = {"startup": {"import_ms": import_time()}}
+    for position in load_positions():
+        start = time.perf_counter()
+        results[position["name"]] = bench_position(position["board"], min_time)
+        print(f"{position['name']}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "min_time": min_time,
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Returns a line per metric that regressed by more than *threshold*."""
+    regressions = []
+    for name, metrics in sorted(current["results"].items()):
+        for metric, value in sorted(metrics.items()):
+            try:
+                before = baseline["results"][name][metric]
+            except KeyError:
+                continue
+
+            change = value / before - 1 if before else 0.0
+            if not HIGHER_IS_BETTER[metric]:
+                change = -change
+            marker = "REGRESSION" if change < -threshold else ""
+            print(f"{name:24} {metric:28} {before:14.1f} {value:14.1f} {change:+8.1%} {marker}")
+            if marker:
+                regressions.append(f"{name} {metric}: {before:.1f} -> {value:.1f} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Engine micro-benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="measure every position and write the results as JSON")
+    run_parser.add_argument("-o", "--out", help="output file, defaults to stdout")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per measurement")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("results", nargs="?", help="results of 'run', measured now if omitted")
+    compare_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, as a fraction")
+    compare_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per measurement")
+
+    memory_parser = commands.add_parser("memory", help="measure bytes per board copy and per move")
+    memory_parser.add_argument("-n", type=int, default=1000, help="number of copies to measure")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        output = json.dumps(run(args.min_time), indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output + "\n")
+        else:
+            print(output)
+        return 0
+
+    if args.command == "memory":
+        for position in load_positions():
+            usage = memory_usage(position["board"], args.n)
+            print(
+                f"{position['name']:24} board {usage['board_bytes']:.0f} bytes, {usage['copy_us']:.2f}us per copy, "
+                f"Move {usage['move_bytes']:.0f} bytes, packed move {usage['packed_move_bytes']:.1f} bytes"
+            )
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run(args.min_time)
+
+    regressions = compare(baseline, current, args.threshold)
+    print(f"\n{len(regressions)} regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""
+Bot-versus-bot matches for public/engine.py over a process pool.
+
+    python benchmarks/selfplay.py FIRST SECOND [--games 100] [--fens fens.txt] [--processes N]
+
+FIRST and SECOND are ``random``, ``value`` or ``search``. Each starting FEN is
+played twice in a row with colors swapped. The report is a win/draw/loss
+table for the first player, the terminations, the average game length and
+the throughput in games per second; ``--moves`` also prints every game.
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "public"))
+
+import engine  # noqa: E402
+
+PlayerFactory = Callable[["engine.BaseBoard"], Any]
+"""Builds a player with a ``get_next_move()`` method for a board, e.g. ``engine.RandomPlayer``."""
+
+PLAYERS: Dict[str, PlayerFactory] = {
+    "random": engine.RandomPlayer,
+    "value": engine.ValuePlayer,
+    "search": engine.SearchPlayer,
+}
+
+
+@dataclass
+class SelfPlayGame:
+    """The result of one game played by :func:`selfplay()`."""
+
+    index: int
+    fen: str
+    first_is_red: bool
+    """Whether the first player of :func:`selfplay()` played red."""
+
+    termination: str
+    winner: Optional[engine.Color]
+    plies: int
+    moves: List[str]
+    """The UCI moves of the game."""
+
+    def first_score(self) -> float:
+        """Returns 1, 0.5 or 0 from the point of view of the first player."""
+        if self.winner is None:
+            return 0.5
+        return 1.0 if (self.winner == engine.RED) == self.first_is_red else 0.0
+
+
+def play_game(task: Tuple[int, str, PlayerFactory, PlayerFactory, str, int]) -> SelfPlayGame:
+    index, fen, first, second, seed, max_plies = task
+    # players draw from the module RNG, one game per task keeps every game reproducible
+    random.seed(seed)
+
+    first_is_red = index % 2 == 0
+    board = engine.BaseBoard(fen)
+    if first_is_red:
+        players = {engine.RED: first(board), engine.BLUE: second(board)}
+    else:
+        players = {engine.RED: second(board), engine.BLUE: first(board)}
+
+    plies = 0
+    outcome = board.outcome()
+    while outcome is None and plies < max_plies:
+        board.push(players[board.turn].get_next_move())
+        plies += 1
+        outcome = board.outcome()
+
+    if outcome is None:
+        outcome = engine.Outcome("max plies", None)
+    return SelfPlayGame(index, fen, first_is_red, outcome.termination, outcome.winner, plies, [move.uci() for move in board.move_stack])
+
+
+def selfplay(first: PlayerFactory, second: PlayerFactory, games: int = 100, fens: Optional[List[str]] = None,
+             processes: Optional[int] = None, seed: int = 0, max_plies: int = 1000) -> List[SelfPlayGame]:
+    """
+    Plays *games* games between two players over a process pool, one game
+    per task. Each FEN is played twice in a row with colors swapped, so the
+    first player is red in even games. Games still running after
+    *max_plies* moves are drawn. Players and their factories must be
+    picklable, so use module level classes or :func:`functools.partial`.
+
+    With ``processes=1`` the games are played in this process.
+    """
+    fens = fens or [engine.STARTING_FEN]
+    tasks = [(i, fens[i // 2 % len(fens)], first, second, f"{seed}:{i}", max_plies) for i in range(games)]
+
+    if processes == 1:
+        return [play_game(task) for task in tasks]
+
+    with multiprocessing.Pool(processes) as pool:
+        results = list(pool.imap_unordered(play_game, tasks, chunksize=1))
+    return sorted(results, key=lambda game: game.index)
+
+
+def report(games: List[SelfPlayGame], first: str, second: str, elapsed: float) -> None:
+    print(f"{'':8} {'win':>6} {'draw':>6} {'loss':>6}")
+    for label, first_is_red in (("as red", True), ("as blue", False), ("total", None)):
+        scores = [game.first_score() for game in games if first_is_red is None or game.first_is_red == first_is_red]
+        print(f"{label:8} {scores.count(1.0):6} {scores.count(0.5):6} {scores.count(0.0):6}")
+    print()
+    print(f"{first} vs {second}: score {sum(game.first_score() for game in games):g}/{len(games)}")
+    terminations: Dict[str, int] = {}
+    for game in games:
+        terminations[game.termination] = terminations.get(game.termination, 0) + 1
+    print("terminations " + ", ".join(f"{name} {count}" for name, count in sorted(terminations.items())))
+    print(f"average plies {sum(game.plies for game in games) / max(len(games), 1):.1f}")
+    print(f"{len(games)} games in {elapsed:.1f}s, {len(games) / elapsed if elapsed else 0:.2f} games/sec")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Play games between two engine players over a process pool.")
+    parser.add_argument("first", choices=sorted(PLAYERS))
+    parser.add_argument("second", choices=sorted(PLAYERS))
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--fens", help="a file with one starting FEN per line")
+    parser.add_argument("--processes", type=int, help="worker processes, defaults to the number of CPUs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=1000)
+    parser.add_argument("--search-ms", type=float, default=100, help="time per move for the search player")
+    parser.add_argument("--moves", action="store_true", help="print the UCI moves of every game")
+    args = parser.parse_args(argv)
+
+    fens = None
+    if args.fens:
+        with open(args.fens) as f:
+            fens = [line.strip() for line in f if line.strip()]
+    factories = {**PLAYERS, "search": functools.partial(engine.SearchPlayer, max_time_ms=args.search_ms)}
+
+    start = time.perf_counter()
+    games = selfplay(factories[args.first], factories[args.second], args.games, fens, args.processes, args.seed, args.max_plies)
+    elapsed = time.perf_counter() - start
+
+    if args.moves:
+        for game in games:
+            print(f"{game.index} {game.termination} {engine.Outcome(game.termination, game.winner).result()} {' '.join(game.moves)}")
+        print()
+
+    report(games, args.first, args.second, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
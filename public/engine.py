@@ -1,12 +1,18 @@
 import base64
+import functools
+import inspect
 import typing
+from array import array
 from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, SupportsInt, Tuple, TypeAlias, Union
 from dataclasses import dataclass
 from typing import Optional, Union, Literal
+import random
 import struct
+import time
 import zlib
 
 if typing.TYPE_CHECKING:
+    import numpy
     from typing_extensions import Self
 
 
@@ -231,6 +237,9 @@ BB_RANKS = [
     BB_RANK_8,
 ] = [0xff << (8 * i) for i in range(8)]
 
+BB_NOT_FILE_A = BB_ALL & ~BB_FILE_A
+BB_NOT_FILE_H = BB_ALL & ~BB_FILE_H
+
 BB_LIGHT_SQUARES = 0x55aa55aa55aa55aa
 BB_DARK_SQUARES = 0xaa55aa55aa55aa55
 
@@ -292,6 +301,13 @@ def flip_diag_a1h8(bb: Bitboard) -> Bitboard:
 def rotate_90_clockwise(bb: Bitboard) -> Bitboard:
     return flip_vertical(flip_diag_a1h8(bb))
 
+def adjacent_squares(b: Bitboard) -> Bitboard:
+    """
+    All squares orthogonally adjacent to any square in *b*. Same as the union
+    of :data:`BB_ADJACENT_SQUARES` over *b*, computed with shifts.
+    """
+    return ((b << 8) | (b >> 8) | ((b << 1) & BB_NOT_FILE_A) | ((b >> 1) & BB_NOT_FILE_H)) & BB_ALL
+
 def _sliding_moves(square: Square, occupied: Bitboard, deltas: Iterable[int]) -> Bitboard:
     attacks = BB_EMPTY
 
@@ -346,19 +362,32 @@ def _carry_rippler(mask: Bitboard) -> Iterator[Bitboard]:
             break
 
 
+class _AttackDict(dict):
+    """
+    Sliding attacks from one square, keyed by the occupied part of its mask.
+    Entries are computed on first lookup, so importing the engine doesn't
+    pay for the thousands of occupancies a game never reaches.
+    """
+
+    __slots__ = ("square", "deltas")
+
+    def __init__(self, square: Square, deltas: List[int]) -> None:
+        super().__init__()
+        self.square = square
+        self.deltas = deltas
+
+    def __missing__(self, occupied: Bitboard) -> Bitboard:
+        attacks = self[occupied] = _sliding_moves(self.square, occupied, self.deltas)
+        return attacks
+
+
 def _attack_table(deltas: List[int]) -> Tuple[List[Bitboard], List[Dict[Bitboard, Bitboard]]]:
     mask_table: List[Bitboard] = []
     attack_table: List[Dict[Bitboard, Bitboard]] = []
 
     for square in SQUARES:
-        attacks = {}
-
-        mask = _sliding_moves(square, 0, deltas) & ~_edges(square)
-        for subset in _carry_rippler(mask):
-            attacks[subset] = _sliding_moves(square, subset, deltas)
-
-        attack_table.append(attacks)
-        mask_table.append(mask)
+        mask_table.append(_sliding_moves(square, 0, deltas) & ~_edges(square))
+        attack_table.append(_AttackDict(square, deltas))
 
     return mask_table, attack_table
 
@@ -395,6 +424,118 @@ def between_inclusive_end(a: Square, b: Square) -> Bitboard:
     bb = BB_RAYS[a][b] & ((BB_ALL << a) ^ (BB_ALL << b))
     return (bb & (bb - 1)) | BB_SQUARES[b]
 
+def bombardment_target(artillery_square: Square, orientation: Orientation, n_squares: int = 2) -> Optional[Square]:
+    """Get the target square for artillery bombardment based on current square and orientation.
+    Returns None if the target square would be off the board."""
+    file = square_file(artillery_square)
+    rank = square_rank(artillery_square)
+    squares = n_squares
+
+    def clamp_to_board(value: int) -> int:
+        return max(0, min(7, value))
+
+    # If it's cardinal directions, we can just clamp the target file or rank
+    if orientation == ORIENT_N:  # North
+        return square(file, clamp_to_board(rank + squares))
+    elif orientation == ORIENT_E:  # East
+        return square(clamp_to_board(file + squares), rank)
+    elif orientation == ORIENT_S:  # South
+        return square(file, clamp_to_board(rank - squares))
+    elif orientation == ORIENT_W:  # West
+        return square(clamp_to_board(file - squares), rank)
+
+    # If it's diagonal directions, we need to work our way back from the target square
+    def find_valid_diagonal(file_delta: int, rank_delta: int, squares: int) -> Optional[Tuple[int, int]]:
+        target_file, target_rank = file + squares * file_delta, rank + squares * rank_delta
+        while (target_file < 0 or target_file > 7 or target_rank < 0 or target_rank > 7) and squares > 0:
+            squares -= 1
+            target_file, target_rank = file + squares * file_delta, rank + squares * rank_delta
+        return None if squares == 0 else (target_file, target_rank)
+
+    if orientation == ORIENT_NE:  # Northeast
+        result = find_valid_diagonal(1, 1, squares)
+    elif orientation == ORIENT_SE:  # Southeast
+        result = find_valid_diagonal(1, -1, squares)
+    elif orientation == ORIENT_SW:  # Southwest
+        result = find_valid_diagonal(-1, -1, squares)
+    else:  # Northwest
+        result = find_valid_diagonal(-1, 1, squares)
+
+    if result is None:
+        return None
+
+    target_file, target_rank = result
+    return square(target_file, target_rank)
+
+def _bombardment_table(n_squares: int) -> List[List[Bitboard]]:
+    table: List[List[Bitboard]] = []
+    for orientation in range(8):
+        row: List[Bitboard] = []
+        for sq in SQUARES:
+            target = bombardment_target(sq, orientation, n_squares)
+            row.append(between_inclusive_end(sq, target) if target is not None else BB_EMPTY)
+        table.append(row)
+    return table
+
+BB_BOMBARD: Dict[int, List[List[Bitboard]]] = {n: _bombardment_table(n) for n in (2, 3)}
+"""Bombarded squares indexed by ``[range][orientation][square]``, for the ranges of 2 (artillery) and 3 (heavy artillery)."""
+
+BombardCounts: TypeAlias = Tuple[Bitboard, Bitboard, Bitboard, Bitboard]
+"""A per-square count of the guns bombarding each square, stored as four bit planes."""
+
+def _bombard_counts_add(counts: BombardCounts, bb: Bitboard) -> BombardCounts:
+    c0, c1, c2, c3 = counts
+    carry0 = c0 & bb
+    carry1 = c1 & carry0
+    carry2 = c2 & carry1
+    return (c0 ^ bb, c1 ^ carry0, c2 ^ carry1, c3 ^ carry2)
+
+def _bombard_counts_remove(counts: BombardCounts, bb: Bitboard) -> BombardCounts:
+    c0, c1, c2, c3 = counts
+    borrow0 = ~c0 & bb
+    borrow1 = ~c1 & borrow0
+    borrow2 = ~c2 & borrow1
+    return (c0 ^ bb, c1 ^ borrow0, c2 ^ borrow1, c3 ^ borrow2)
+
+def _zobrist_keys(rng: random.Random, n: int) -> List[int]:
+    return [rng.getrandbits(64) for _ in range(n)]
+
+_zobrist_rng = random.Random(0x6791)
+
+ZOBRIST_PIECES: List[List[List[int]]] = [[_zobrist_keys(_zobrist_rng, 64) for _ in range(8)] for _ in COLORS]
+"""Keys indexed by ``[color][piece_type][square]``."""
+
+ZOBRIST_ORIENTATIONS: List[List[int]] = [[0] * 64] + [_zobrist_keys(_zobrist_rng, 64) for _ in range(1, 8)]
+"""Keys indexed by ``[orientation][square]``. ``ORIENT_N`` sets no orientation bits, so it has no key."""
+
+ZOBRIST_RESERVE_COUNTS = 32
+ZOBRIST_RESERVES: List[List[int]] = [[0] + _zobrist_keys(_zobrist_rng, ZOBRIST_RESERVE_COUNTS - 1) for _ in range(8)]
+"""Keys indexed by ``[piece_type][count % ZOBRIST_RESERVE_COUNTS]``. Empty reserves have no key."""
+
+ZOBRIST_TURN: int = _zobrist_rng.getrandbits(64)
+ZOBRIST_TURN_MOVES: List[int] = [0] + _zobrist_keys(_zobrist_rng, 3)
+ZOBRIST_TURN_PIECES: List[int] = _zobrist_keys(_zobrist_rng, 64)
+ZOBRIST_FREE_CAPTURE_CLUSTERS: List[int] = _zobrist_keys(_zobrist_rng, 64)
+ZOBRIST_FREE_CAPTURE_ENEMIES: List[int] = _zobrist_keys(_zobrist_rng, 64)
+ZOBRIST_FREE_CAPTURE_NUM_ALLOWED: List[int] = _zobrist_keys(_zobrist_rng, 64)
+ZOBRIST_DID_OFFER_DRAW: int = _zobrist_rng.getrandbits(64)
+ZOBRIST_DID_ACCEPT_DRAW: int = _zobrist_rng.getrandbits(64)
+
+def _zobrist_squares(keys: List[int], bb: Bitboard) -> int:
+    h = 0
+    for square in scan_reversed(bb):
+        h ^= keys[square]
+    return h
+
+def _zobrist_free_captures(clusters: Bitboard, enemies: Bitboard, num_allowed: Bitboard) -> int:
+    return (_zobrist_squares(ZOBRIST_FREE_CAPTURE_CLUSTERS, clusters) ^
+            _zobrist_squares(ZOBRIST_FREE_CAPTURE_ENEMIES, enemies) ^
+            _zobrist_squares(ZOBRIST_FREE_CAPTURE_NUM_ALLOWED, num_allowed))
+
+def _zobrist_swap_colors(h: int) -> int:
+    # Rotating by half the word keeps the blue reserve keys distinct from the red ones.
+    return ((h << 32) | (h >> 32)) & BB_ALL
+
 @dataclass
 class Outcome:
     """
@@ -429,6 +570,8 @@ def is_armored(piece_type: PieceType) -> bool:
     return piece_type == ARMORED_INFANTRY or piece_type == ARMORED_ARTILLERY
 
 class Piece:
+    __slots__ = ("piece_type", "color", "orientation")
+
     piece_type: PieceType
     color: Color
     orientation: Optional[Orientation]
@@ -471,42 +614,72 @@ class Piece:
             orientation = cardinal_to_orientation(symbol[1])
             return cls(piece_type, color, orientation)
 
+RESERVE_FIELD_BITS = 5
+RESERVE_MAX_COUNT = (1 << RESERVE_FIELD_BITS) - 1
+
+_RESERVE_PIECE_TYPES: List[PieceType] = [INFANTRY, ARMORED_INFANTRY, AIRBORNE_INFANTRY, ARTILLERY, ARMORED_ARTILLERY, HEAVY_ARTILLERY, HQ]
+_RESERVE_SHIFTS: List[int] = [0] * 8
+for _field, _piece_type in enumerate(_RESERVE_PIECE_TYPES):
+    _RESERVE_SHIFTS[_piece_type] = _field * RESERVE_FIELD_BITS
+
+
 class ReserveFleet:
+    """
+    The pieces a player can still reinforce with. The counts are packed
+    into a single int with :data:`RESERVE_FIELD_BITS` bits per piece type.
+    """
+
+    __slots__ = ("_packed", "_zobrist")
+
     def __init__(self) -> None:
-        self._counts: Dict[PieceType, int] = {
-            INFANTRY: 0,
-            ARMORED_INFANTRY: 0,
-            AIRBORNE_INFANTRY: 0,
-            ARTILLERY: 0,
-            ARMORED_ARTILLERY: 0,
-            HEAVY_ARTILLERY: 0,
-            HQ: 0,
-        }
+        self._packed = 0
+        self._zobrist = 0
 
     def __iter__(self) -> Iterator[Tuple[PieceType, int]]:
-        for piece_type, count in self._counts.items():
-            if count > 0:
-                yield piece_type, count
+        packed = self._packed
+        while packed:
+            field = ((packed & -packed).bit_length() - 1) // RESERVE_FIELD_BITS
+            shift = field * RESERVE_FIELD_BITS
+            yield _RESERVE_PIECE_TYPES[field], packed >> shift & RESERVE_MAX_COUNT
+            packed &= ~(RESERVE_MAX_COUNT << shift)
 
     def get_count(self, piece_type: PieceType) -> int:
-        return self._counts.get(piece_type, 0)
+        return self._packed >> _RESERVE_SHIFTS[piece_type] & RESERVE_MAX_COUNT
 
     def add(self, piece_type: PieceType, count: int = 1) -> None:
-        self._counts[piece_type] = self._counts.get(piece_type, 0) + count
+        shift = _RESERVE_SHIFTS[piece_type]
+        current = self._packed >> shift & RESERVE_MAX_COUNT
+        if current + count > RESERVE_MAX_COUNT:
+            raise ValueError(f"Too many pieces in reserve: {piece_name(piece_type)}")
+        self._packed += count << shift
+        keys = ZOBRIST_RESERVES[piece_type]
+        self._zobrist ^= keys[current % ZOBRIST_RESERVE_COUNTS] ^ keys[(current + count) % ZOBRIST_RESERVE_COUNTS]
 
     def remove(self, piece_type: PieceType, count: int = 1) -> None:
-        current = self._counts.get(piece_type, 0)
+        shift = _RESERVE_SHIFTS[piece_type]
+        current = self._packed >> shift & RESERVE_MAX_COUNT
         if current < count:
             raise ValueError(f"Not enough pieces in reserve: {piece_name(piece_type)}")
-        self._counts[piece_type] = current - count
-        if self._counts[piece_type] == 0:
-            del self._counts[piece_type]
+        self._packed -= count << shift
+        keys = ZOBRIST_RESERVES[piece_type]
+        self._zobrist ^= keys[current % ZOBRIST_RESERVE_COUNTS] ^ keys[(current - count) % ZOBRIST_RESERVE_COUNTS]
+
+    def zobrist_hash(self) -> int:
+        """Returns a 64-bit hash of the reserve counts."""
+        return self._zobrist
+
+    def _compute_zobrist(self) -> int:
+        h = 0
+        packed = self._packed
+        for piece_type in _RESERVE_PIECE_TYPES:
+            h ^= ZOBRIST_RESERVES[piece_type][(packed >> _RESERVE_SHIFTS[piece_type] & RESERVE_MAX_COUNT) % ZOBRIST_RESERVE_COUNTS]
+        return h
 
     def to_fen(self, color: Color) -> str:
         return "".join(
             piece_symbol(pt).upper() if color == RED else piece_symbol(pt).lower()
-            for pt, count in sorted(self._counts.items())
-            for _ in range(count)
+            for pt in PIECE_TYPES
+            for _ in range(self.get_count(pt))
         )
 
     @classmethod
@@ -518,35 +691,61 @@ class ReserveFleet:
         return reserve
 
     def to_ints(self) -> List[int]:
-        return [
-            self._counts.get(INFANTRY, 0),
-            self._counts.get(ARMORED_INFANTRY, 0),
-            self._counts.get(AIRBORNE_INFANTRY, 0),
-            self._counts.get(ARTILLERY, 0),
-            self._counts.get(ARMORED_ARTILLERY, 0),
-            self._counts.get(HEAVY_ARTILLERY, 0),
-        ]
+        return [self.get_count(piece_type) for piece_type in _RESERVE_PIECE_TYPES[:6]]
 
     @classmethod
     def from_ints(cls, ints: List[int]) -> "ReserveFleet":
         reserve = cls()
-        reserve._counts = {
-            INFANTRY: ints[0],
-            ARMORED_INFANTRY: ints[1],
-            AIRBORNE_INFANTRY: ints[2],
-            ARTILLERY: ints[3],
-            ARMORED_ARTILLERY: ints[4],
-            HEAVY_ARTILLERY: ints[5],
-        }
+        for piece_type, count in zip(_RESERVE_PIECE_TYPES, ints):
+            if not 0 <= count <= RESERVE_MAX_COUNT:
+                raise ValueError(f"invalid reserve count for {piece_name(piece_type)}: {count}")
+            reserve._packed |= count << _RESERVE_SHIFTS[piece_type]
+        reserve._zobrist = reserve._compute_zobrist()
+        return reserve
+
+    @classmethod
+    def _from_packed(cls, packed: int) -> "ReserveFleet":
+        reserve = cls()
+        reserve._packed = packed
+        reserve._zobrist = reserve._compute_zobrist()
         return reserve
 
     def copy(self) -> "ReserveFleet":
         new = type(self)()
-        new._counts = self._counts.copy()
+        new._packed = self._packed
+        new._zobrist = self._zobrist
         return new
 
 
-@dataclass(unsafe_hash=True)
+SERIALIZATION_VERSION = 2
+"""The version byte written by :func:`BaseBoard.to_bytes()`."""
+
+
+PackedMove: TypeAlias = int
+"""
+A move packed into 32 bits: the kind in bits 0-2, the from square in bits
+3-8, the to square in bits 9-14, the capture square plus one in bits 15-21,
+the unit type in bits 22-24 and the orientation plus one in bits 25-28.
+Zero is never a valid move.
+"""
+
+PACKED_SKIP: PackedMove = 1
+PACKED_REINFORCE: PackedMove = 2
+PACKED_MOVE: PackedMove = 3
+PACKED_MOVE_AND_ORIENT: PackedMove = 4
+PACKED_BOMBARD: PackedMove = 5
+PACKED_FREE_CAPTURE: PackedMove = 6
+
+_PACKED_KINDS = {
+    "Skip": PACKED_SKIP,
+    "Reinforce": PACKED_REINFORCE,
+    "Move": PACKED_MOVE,
+    "MoveAndOrient": PACKED_MOVE_AND_ORIENT,
+    "AutoCapture": PACKED_BOMBARD,
+}
+
+
+@dataclass(unsafe_hash=True, slots=True)
 class Move:
     """
     Represents a move in the game. Can be one of:
@@ -755,7 +954,52 @@ class Move:
         return cls(name="AutoCapture", auto_capture_type="free", capture_preference=capture_preference)
 
     def copy(self) -> "Move":
-        return Move(**self.__dict__)
+        return Move(self.name, self.from_square, self.to_square, self.unit_type, self.orientation, self.capture_preference, self.auto_capture_type)
+
+    def pack(self) -> PackedMove:
+        """Packs the move into a :data:`PackedMove`."""
+        if self.name == "AutoCapture" and self.auto_capture_type == "free":
+            packed = PACKED_FREE_CAPTURE
+        else:
+            packed = _PACKED_KINDS[self.name]
+
+        if self.name in ("Reinforce", "Move", "MoveAndOrient") and self.to_square is None:
+            raise ValueError(f"cannot pack incomplete move: {self.uci()!r}")
+        if self.from_square is not None:
+            packed |= self.from_square << 3
+        if self.to_square is not None:
+            packed |= self.to_square << 9
+        if self.capture_preference is not None:
+            packed |= (self.capture_preference + 1) << 15
+        if self.unit_type is not None:
+            packed |= self.unit_type << 22
+        if self.orientation is not None:
+            packed |= (self.orientation + 1) << 25
+        return packed
+
+    @classmethod
+    def from_packed(cls, packed: PackedMove) -> "Move":
+        """Unpacks a move created by :func:`~Move.pack()`."""
+        kind = packed & 7
+        from_square = packed >> 3 & 63
+        to_square = packed >> 9 & 63
+        capture = packed >> 15 & 127
+        capture_preference = capture - 1 if capture else None
+
+        if kind == PACKED_MOVE:
+            return cls(name="Move", from_square=from_square, to_square=to_square, capture_preference=capture_preference)
+        if kind == PACKED_MOVE_AND_ORIENT:
+            orientation = packed >> 25 & 15
+            return cls(name="MoveAndOrient", from_square=from_square, to_square=to_square, orientation=orientation - 1 if orientation else None)
+        if kind == PACKED_REINFORCE:
+            return cls(name="Reinforce", unit_type=packed >> 22 & 7, to_square=to_square, capture_preference=capture_preference)
+        if kind == PACKED_BOMBARD:
+            return cls(name="AutoCapture", auto_capture_type="bombard", capture_preference=capture_preference)
+        if kind == PACKED_FREE_CAPTURE:
+            return cls(name="AutoCapture", auto_capture_type="free", capture_preference=capture_preference)
+        if kind == PACKED_SKIP:
+            return cls(name="Skip")
+        raise ValueError(f"invalid packed move: {packed:#x}")
 
     def with_capture(self, capture_preference: Square) -> "Move":
         """Creates a move with a capture preference."""
@@ -765,7 +1009,118 @@ class Move:
         m.capture_preference = capture_preference
         return m
 
+def _is_bare_capture(move: Move) -> bool:
+    # auto-captures only carry the captured square
+    return (move.capture_preference is not None and move.from_square is None and move.to_square is None
+            and move.unit_type is None and move.orientation is None)
+
+
+def packed_move_uci(packed: PackedMove) -> str:
+    """Gets the UCI notation of a :data:`PackedMove`."""
+    return Move.from_packed(packed).uci()
+
+
+def packed_move_from_uci(uci: str) -> PackedMove:
+    """Parses UCI notation into a :data:`PackedMove`."""
+    return Move.from_uci(uci).pack()
+
+
+class _BoardState:
+    """
+    A snapshot of everything :func:`BaseBoard.push()` may change, so that
+    :func:`BaseBoard.pop()` can restore the previous position in place.
+    """
+
+    __slots__ = (
+        "infantry", "armored_infantry", "airborne_infantry", "artillery",
+        "armored_artillery", "heavy_artillery", "hq", "occupied",
+        "occupied_r", "occupied_b", "bombarded_r", "bombarded_b",
+        "bombard_counts_r", "bombard_counts_b", "adjacent_infantry_r", "adjacent_infantry_b",
+        "orientation_bit0", "orientation_bit1", "orientation_bit2", "turn",
+        "turn_moves", "turn_auto_moves", "turn_pieces", "free_capture_clusters",
+        "free_capture_enemies", "free_capture_num_allowed", "did_offer_draw", "did_accept_draw",
+        "piece_square_r", "piece_square_b", "zobrist", "reinforced", "packed",
+    )
+
+    def __init__(self, board: "BaseBoard") -> None:
+        self.infantry = board.infantry
+        self.armored_infantry = board.armored_infantry
+        self.airborne_infantry = board.airborne_infantry
+        self.artillery = board.artillery
+        self.armored_artillery = board.armored_artillery
+        self.heavy_artillery = board.heavy_artillery
+        self.hq = board.hq
+        self.occupied = board.occupied
+        self.occupied_r = board.occupied_co[RED]
+        self.occupied_b = board.occupied_co[BLUE]
+        self.bombarded_r = board.bombarded_co[RED]
+        self.bombarded_b = board.bombarded_co[BLUE]
+        self.bombard_counts_r = board.bombard_counts_co[RED]
+        self.bombard_counts_b = board.bombard_counts_co[BLUE]
+        self.adjacent_infantry_r = board.adjacent_infantry_squares_co[RED]
+        self.adjacent_infantry_b = board.adjacent_infantry_squares_co[BLUE]
+        self.orientation_bit0 = board.orientation_bit0
+        self.orientation_bit1 = board.orientation_bit1
+        self.orientation_bit2 = board.orientation_bit2
+        self.turn = board.turn
+        self.turn_moves = board.turn_moves
+        self.turn_auto_moves = board.turn_auto_moves
+        self.turn_pieces = board.turn_pieces
+        self.free_capture_clusters = board.free_capture_clusters
+        self.free_capture_enemies = board.free_capture_enemies
+        self.free_capture_num_allowed = board.free_capture_num_allowed
+        self.did_offer_draw = board.did_offer_draw
+        self.did_accept_draw = board.did_accept_draw
+        self.piece_square_r = board.piece_square_co[RED]
+        self.piece_square_b = board.piece_square_co[BLUE]
+        self.zobrist = board._zobrist
+        self.reinforced: Optional[PieceType] = None  # set by push() to give the unit back on pop()
+        self.packed: Optional[PackedMove] = None  # set by push_packed(), which leaves the move stack alone
+
+    def restore(self, board: "BaseBoard") -> None:
+        board.infantry = self.infantry
+        board.armored_infantry = self.armored_infantry
+        board.airborne_infantry = self.airborne_infantry
+        board.artillery = self.artillery
+        board.armored_artillery = self.armored_artillery
+        board.heavy_artillery = self.heavy_artillery
+        board.hq = self.hq
+        board.occupied = self.occupied
+        board.occupied_co[RED] = self.occupied_r
+        board.occupied_co[BLUE] = self.occupied_b
+        board.bombarded_co[RED] = self.bombarded_r
+        board.bombarded_co[BLUE] = self.bombarded_b
+        board.bombard_counts_co[RED] = self.bombard_counts_r
+        board.bombard_counts_co[BLUE] = self.bombard_counts_b
+        board.adjacent_infantry_squares_co[RED] = self.adjacent_infantry_r
+        board.adjacent_infantry_squares_co[BLUE] = self.adjacent_infantry_b
+        board.orientation_bit0 = self.orientation_bit0
+        board.orientation_bit1 = self.orientation_bit1
+        board.orientation_bit2 = self.orientation_bit2
+        board.turn = self.turn
+        board.turn_moves = self.turn_moves
+        board.turn_auto_moves = self.turn_auto_moves
+        board.turn_pieces = self.turn_pieces
+        board.free_capture_clusters = self.free_capture_clusters
+        board.free_capture_enemies = self.free_capture_enemies
+        board.free_capture_num_allowed = self.free_capture_num_allowed
+        board.did_offer_draw = self.did_offer_draw
+        board.did_accept_draw = self.did_accept_draw
+        board.piece_square_co[RED] = self.piece_square_r
+        board.piece_square_co[BLUE] = self.piece_square_b
+        board._zobrist = self.zobrist
+
+
 class BaseBoard:
+    __slots__ = (
+        "occupied", "occupied_co", "infantry", "armored_infantry", "airborne_infantry", "artillery",
+        "armored_artillery", "heavy_artillery", "hq", "reserves", "turn", "turn_moves", "turn_auto_moves",
+        "turn_pieces", "orientation_bit0", "orientation_bit1", "orientation_bit2", "bombarded_co",
+        "bombard_counts_co", "adjacent_infantry_squares_co", "end_of_turn_occupied_enemy_infantry",
+        "free_capture_clusters", "free_capture_enemies", "free_capture_num_allowed",
+        "move_stack", "_stack", "did_offer_draw", "did_accept_draw", "piece_square_co", "_zobrist",
+    )
+
     # core game state
     occupied: Bitboard
     occupied_co: Tuple[Bitboard, Bitboard]
@@ -785,6 +1140,7 @@ class BaseBoard:
     orientation_bit1: Bitboard
     orientation_bit2: Bitboard
     bombarded_co: Tuple[Bitboard, Bitboard]
+    bombard_counts_co: Tuple[BombardCounts, BombardCounts]
     adjacent_infantry_squares_co: Tuple[Bitboard, Bitboard]
 
     free_capture_clusters: Bitboard
@@ -793,11 +1149,21 @@ class BaseBoard:
 
     # optional game state
     move_stack: List[Move]
+    _stack: List[_BoardState]
 
     # computed game state from move history
     did_offer_draw: bool
     did_accept_draw: bool
 
+    # incrementally updated material and piece-square score of each color,
+    # in integer thousandths of a point (see PIECE_SQUARE_SCORES), None on
+    # a decoded board until first used
+    piece_square_co: Optional[List[int]]
+
+    # incrementally updated zobrist hash, excluding reserves and draw flags,
+    # None on a decoded board until first used
+    _zobrist: Optional[int]
+
     def __init__(self, board_fen: Optional[str] = STARTING_FEN, skip_init: bool = False) -> None:
         if skip_init:
             return
@@ -833,62 +1199,149 @@ class BaseBoard:
         self.orientation_bit1 = BB_EMPTY  # Second bit of orientation
         self.orientation_bit2 = BB_EMPTY  # Third bit of orientation
         self.bombarded_co = [BB_EMPTY, BB_EMPTY]
+        self.bombard_counts_co = [(BB_EMPTY, BB_EMPTY, BB_EMPTY, BB_EMPTY), (BB_EMPTY, BB_EMPTY, BB_EMPTY, BB_EMPTY)]
         self.adjacent_infantry_squares_co = [BB_EMPTY, BB_EMPTY]
         self.free_capture_clusters = BB_EMPTY
         self.free_capture_enemies = BB_EMPTY
         self.free_capture_num_allowed = BB_EMPTY
         self.move_stack = []
+        self._stack = []
         self.did_offer_draw = False
         self.did_accept_draw = False
+        self.piece_square_co = [0, 0]
+        self._zobrist = 0
 
     def serialize(self) -> str:
-        # Pack all integers into a byte array
-        # Q = unsigned long long (64 bits) for bitboards
-        # b = signed char (8 bits) for turn state
-        # I = unsigned int (32 bits) for reserve counts
-        packed = struct.pack(
-            ">21Q3b12I2b",  # big-endian format
-            # units
-            self.occupied,
-            self.infantry,
-            self.armored_infantry,
-            self.airborne_infantry,
-            self.artillery,
-            self.armored_artillery,
-            self.heavy_artillery,
-            self.hq,
-            # colors
-            self.occupied_co[0],
-            self.occupied_co[1],
-            self.bombarded_co[0],
-            self.bombarded_co[1],
-            self.adjacent_infantry_squares_co[0],
-            self.adjacent_infantry_squares_co[1],
-            # orientation
-            self.orientation_bit0,
-            self.orientation_bit1,
-            self.orientation_bit2,
-            # mid-turn state
+        """
+        Encodes the position as a base64 string of :func:`~BaseBoard.to_bytes()`.
+        :func:`~BaseBoard.deserialize()` also still reads the older
+        zlib-compressed format.
+        """
+        return base64.b64encode(self.to_bytes()).decode()
+
+    def to_bytes(self) -> bytes:
+        """
+        Packs the position into the compact binary format.
+
+        Only the primitive state is stored: a version byte, the turn and draw
+        flags, the turn counters, both reserves, a mask of the non-empty
+        bitboards and then those bitboards. Pieces are stored as three bit
+        planes of their type, one of their color and three of their
+        orientation. Occupancy, bombardments and infantry adjacency are
+        recomputed by :func:`~BaseBoard.from_bytes()`, the hash and the
+        piece-square scores on first use.
+        """
+        occupied = self.occupied
+        bitboards = (
+            self.hq | self.armored_infantry | self.artillery | self.heavy_artillery,
+            self.infantry | self.armored_infantry | self.armored_artillery | self.heavy_artillery,
+            self.airborne_infantry | self.artillery | self.armored_artillery | self.heavy_artillery,
+            self.occupied_co[BLUE],
+            self.orientation_bit0 & occupied,
+            self.orientation_bit1 & occupied,
+            self.orientation_bit2 & occupied,
             self.turn_pieces,
             self.free_capture_clusters,
             self.free_capture_enemies,
             self.free_capture_num_allowed,
-            # move state
-            self.turn,
-            self.turn_moves,
-            self.turn_auto_moves,
-            # reserve
-            *self.reserves[0].to_ints(),
-            *self.reserves[1].to_ints(),
-            self.did_offer_draw,
-            self.did_accept_draw,
         )
-        return base64.b64encode(zlib.compress(packed)).decode()
+        present = 0
+        for i, bb in enumerate(bitboards):
+            if bb:
+                present |= 1 << i
+        nonempty = [bb for bb in bitboards if bb]
+
+        flags = bool(self.turn) | bool(self.did_offer_draw) << 1 | bool(self.did_accept_draw) << 2
+        return b"".join((
+            struct.pack(">4B", SERIALIZATION_VERSION, flags, self.turn_moves, self.turn_auto_moves),
+            self.reserves[RED]._packed.to_bytes(5, "big"),
+            self.reserves[BLUE]._packed.to_bytes(5, "big"),
+            struct.pack(f">H{len(nonempty)}Q", present, *nonempty),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BaseBoard":
+        """
+        Unpacks a position created by :func:`~BaseBoard.to_bytes()`.
+
+        :raises: :exc:`ValueError` if the data is not in a known format.
+        """
+        if not data or data[0] != SERIALIZATION_VERSION:
+            raise ValueError(f"unsupported state version: {data[0] if data else None}")
+
+        try:
+            flags, turn_moves, turn_auto_moves = struct.unpack_from(">3B", data, 1)
+            present, = struct.unpack_from(">H", data, 14)
+            values = iter(struct.unpack_from(f">{popcount(present)}Q", data, 16))
+        except struct.error as err:
+            raise ValueError(f"truncated state: {err}")
+        if len(data) != 16 + 8 * popcount(present):
+            raise ValueError(f"invalid state length: {len(data)}")
+
+        type0, type1, type2, blue, bit0, bit1, bit2, turn_pieces, clusters, enemies, num_allowed = (
+            next(values) if present >> i & 1 else BB_EMPTY for i in range(11)
+        )
+
+        board = cls(skip_init=True)
+        board.hq = type0 & ~type1 & ~type2
+        board.infantry = ~type0 & type1 & ~type2
+        board.armored_infantry = type0 & type1 & ~type2
+        board.airborne_infantry = ~type0 & ~type1 & type2
+        board.artillery = type0 & ~type1 & type2
+        board.armored_artillery = ~type0 & type1 & type2
+        board.heavy_artillery = type0 & type1 & type2
+        board.occupied = type0 | type1 | type2
+        board.occupied_co = [board.occupied & ~blue, blue]
+        board.orientation_bit0 = bit0
+        board.orientation_bit1 = bit1
+        board.orientation_bit2 = bit2
+        board.turn_pieces = turn_pieces
+        board.free_capture_clusters = clusters
+        board.free_capture_enemies = enemies
+        board.free_capture_num_allowed = num_allowed
+
+        board.bombard_counts_co = [board._compute_bombard_counts(RED), board._compute_bombard_counts(BLUE)]
+        board.bombarded_co = [c[0] | c[1] | c[2] | c[3] for c in board.bombard_counts_co]
+        board.adjacent_infantry_squares_co = [board.get_adjacent_infantry_squares(RED), board.get_adjacent_infantry_squares(BLUE)]
+
+        board.turn = bool(flags & 1)
+        board.did_offer_draw = bool(flags & 2)
+        board.did_accept_draw = bool(flags & 4)
+        board.turn_moves = turn_moves
+        board.turn_auto_moves = turn_auto_moves
+
+        board.reserves = [
+            ReserveFleet._from_packed(int.from_bytes(data[4:9], "big")),
+            ReserveFleet._from_packed(int.from_bytes(data[9:14], "big")),
+        ]
+        board.move_stack = []
+        board._stack = []
+        board.piece_square_co = None
+        board._zobrist = None
+        return board
 
     @classmethod
     def deserialize(cls, data: str) -> "BaseBoard":
-        # Decompress the data first
-        decompressed = zlib.decompress(base64.b64decode(data))
+        """
+        Decodes a board created by :func:`~BaseBoard.serialize()`.
+
+        Decoded boards are kept in a bounded LRU cache (see
+        :func:`board_cache_info()`), so decoding the same state again only
+        costs a :func:`~BaseBoard.copy()`. The returned board is always a
+        fresh copy that the caller may modify.
+        """
+        if cls is BaseBoard:
+            return _deserialize_cached(data).copy()
+        return cls._deserialize(data)
+
+    @classmethod
+    def _deserialize(cls, data: str) -> "BaseBoard":
+        raw = base64.b64decode(data)
+        if raw[:1] != b"\x78":
+            return cls.from_bytes(raw)
+
+        # Legacy format, a zlib stream
+        decompressed = zlib.decompress(raw)
 
         # Unpack the byte array back into integers
         values = struct.unpack(">21Q3b12I2b", decompressed)
@@ -938,6 +1391,11 @@ class BaseBoard:
 
         # move stack
         board.move_stack = []
+        board._stack = []
+
+        board.bombard_counts_co = [board._compute_bombard_counts(RED), board._compute_bombard_counts(BLUE)]
+        board.piece_square_co = None
+        board._zobrist = None
 
         return board
 
@@ -1041,13 +1499,20 @@ class BaseBoard:
         else:
             return None
 
+        self._zobrist ^= ZOBRIST_PIECES[piece_color][piece_type][square]
+        self.piece_square_co[piece_color] -= PIECE_SQUARE_SCORES[piece_color][piece_type][square]
+        if (self.orientation_bit0 | self.orientation_bit1 | self.orientation_bit2) & mask:
+            self._zobrist ^= ZOBRIST_ORIENTATIONS[self.get_orientation(square)][square]
+
         self.occupied ^= mask
         self.occupied_co[piece_color] ^= mask
 
-        self.set_orientation(square, None)
-
         if is_artillery(piece_type):
-            self.bombarded_co[piece_color] = self.get_bombarded_squares(piece_color)
+            counts = _bombard_counts_remove(self.bombard_counts_co[piece_color], self._bombard_ray(square, piece_type))
+            self.bombard_counts_co[piece_color] = counts
+            self.bombarded_co[piece_color] = counts[0] | counts[1] | counts[2] | counts[3]
+
+        self.set_orientation(square, None)
 
         if is_infantry(piece_type):
             self.adjacent_infantry_squares_co[piece_color] = self.get_adjacent_infantry_squares(piece_color)
@@ -1079,15 +1544,23 @@ class BaseBoard:
         self.occupied ^= mask
         self.occupied_co[color] ^= mask
 
+        self._zobrist ^= ZOBRIST_PIECES[color][piece_type][square]
+        self.piece_square_co[color] += PIECE_SQUARE_SCORES[color][piece_type][square]
+        if orientation:
+            self._zobrist ^= ZOBRIST_ORIENTATIONS[orientation][square]
+
         self.set_orientation(square, orientation)
 
         if is_artillery(piece_type):
-            self.bombarded_co[color] = self.get_bombarded_squares(color)
+            counts = _bombard_counts_add(self.bombard_counts_co[color], self._bombard_ray(square, piece_type))
+            self.bombard_counts_co[color] = counts
+            self.bombarded_co[color] = counts[0] | counts[1] | counts[2] | counts[3]
 
         if is_infantry(piece_type):
             self.adjacent_infantry_squares_co[color] = self.get_adjacent_infantry_squares(color)
 
     def set_piece_at(self, square: Square, piece: Optional[Piece]) -> None:
+        self._ensure_incremental_state()
         if piece is None:
             self._remove_piece_at(square)
         else:
@@ -1108,6 +1581,7 @@ class BaseBoard:
             self.turn = RED
         elif turn_fen == "b":
             self.turn = BLUE
+            self._zobrist ^= ZOBRIST_TURN
         else:
             raise ValueError("Invalid turn in FEN string: must be 'r' or 'b'")
 
@@ -1175,12 +1649,72 @@ class BaseBoard:
     def remove_from_reserve(self, piece_type: PieceType, color: Color, count: int = 1) -> None:
         self.reserves[color].remove(piece_type, count)
 
+    def zobrist_hash(self) -> int:
+        """
+        Returns a 64-bit Zobrist hash of the position.
+
+        Covers pieces, orientations, reserves, the side to move, moves made
+        this turn, pieces already moved this turn, pending free captures and
+        draw offers. The hash is maintained incrementally, so this is O(1).
+        """
+        if self._zobrist is None:
+            self._zobrist = self._compute_zobrist()
+        h = self._zobrist ^ self.reserves[RED]._zobrist ^ _zobrist_swap_colors(self.reserves[BLUE]._zobrist)
+        if self.did_offer_draw:
+            h ^= ZOBRIST_DID_OFFER_DRAW
+        if self.did_accept_draw:
+            h ^= ZOBRIST_DID_ACCEPT_DRAW
+        return h
+
+    def _ensure_incremental_state(self) -> None:
+        """
+        Computes the piece-square scores and the hash if decoding left them
+        unset. The web client decodes a board for every query and often only
+        generates moves from it, so both are built on first use instead.
+        """
+        if self.piece_square_co is None:
+            self.piece_square_co = [self._compute_piece_square_score(RED), self._compute_piece_square_score(BLUE)]
+        if self._zobrist is None:
+            self._zobrist = self._compute_zobrist()
+
+    def _compute_piece_square_score(self, color: Color) -> int:
+        """Computes the incrementally updated piece-square score of *color* from scratch."""
+        score = 0
+        for piece_type in PIECE_TYPES:
+            scores = PIECE_SQUARE_SCORES[color][piece_type]
+            for square in scan_reversed(self.pieces_mask(piece_type, color)):
+                score += scores[square]
+        return score
+
+    def _compute_zobrist(self) -> int:
+        """Computes the incrementally updated part of the hash from scratch."""
+        h = 0
+        for piece_type, bb in (
+            (HQ, self.hq),
+            (INFANTRY, self.infantry),
+            (ARMORED_INFANTRY, self.armored_infantry),
+            (AIRBORNE_INFANTRY, self.airborne_infantry),
+            (ARTILLERY, self.artillery),
+            (ARMORED_ARTILLERY, self.armored_artillery),
+            (HEAVY_ARTILLERY, self.heavy_artillery),
+        ):
+            for color in COLORS:
+                keys = ZOBRIST_PIECES[color][piece_type]
+                for square in scan_reversed(bb & self.occupied_co[color]):
+                    h ^= keys[square]
+        bit0, bit1, bit2 = self.orientation_bit0, self.orientation_bit1, self.orientation_bit2
+        for square in scan_reversed((bit0 | bit1 | bit2) & self.occupied):
+            orientation = (bit0 >> square & 1) | (bit1 >> square & 1) << 1 | (bit2 >> square & 1) << 2
+            h ^= ZOBRIST_ORIENTATIONS[orientation][square]
+        if self.turn:
+            h ^= ZOBRIST_TURN
+        h ^= ZOBRIST_TURN_MOVES[self.turn_moves]
+        h ^= _zobrist_squares(ZOBRIST_TURN_PIECES, self.turn_pieces)
+        h ^= _zobrist_free_captures(self.free_capture_clusters, self.free_capture_enemies, self.free_capture_num_allowed)
+        return h
+
     def _transposition_key(self) -> Hashable:
-        return (self.infantry, self.armored_infantry, self.airborne_infantry,
-                self.artillery, self.armored_artillery, self.heavy_artillery,
-                self.hq, self.occupied_co[RED], self.occupied_co[BLUE],
-                self.turn, self.turn_pieces,
-                self.orientation_bit0, self.orientation_bit1, self.orientation_bit2)
+        return self.zobrist_hash()
 
     def __repr__(self) -> str:
         return f"BaseBoard('{self.board_fen()}')"
@@ -1275,6 +1809,8 @@ class BaseBoard:
         self.occupied_co[BLUE] = f(self.occupied_co[BLUE])
         self.bombarded_co[RED] = f(self.bombarded_co[RED])
         self.bombarded_co[BLUE] = f(self.bombarded_co[BLUE])
+        self.bombard_counts_co[RED] = tuple(f(plane) for plane in self.bombard_counts_co[RED])
+        self.bombard_counts_co[BLUE] = tuple(f(plane) for plane in self.bombard_counts_co[BLUE])
         self.adjacent_infantry_squares_co[RED] = f(self.adjacent_infantry_squares_co[RED])
         self.adjacent_infantry_squares_co[BLUE] = f(self.adjacent_infantry_squares_co[BLUE])
         self.occupied = f(self.occupied)
@@ -1283,6 +1819,9 @@ class BaseBoard:
         self.orientation_bit1 = f(self.orientation_bit1)
         self.orientation_bit2 = f(self.orientation_bit2)
 
+        self.piece_square_co = [self._compute_piece_square_score(RED), self._compute_piece_square_score(BLUE)]
+        self._zobrist = self._compute_zobrist()
+
     def apply_orientation_transform(self, f: Callable[[int, int, int], Tuple[int, int, int]]) -> None:
         # Get all pieces that have an orientation
         pieces_with_orientation = self.occupied & (self.artillery | self.armored_artillery | self.heavy_artillery)
@@ -1296,16 +1835,21 @@ class BaseBoard:
         # Apply the transform to each bit
         self.orientation_bit0, self.orientation_bit1, self.orientation_bit2 = f(bit0, bit1, bit2)
 
+        # bombardments follow the new orientations
+        for color in COLORS:
+            self.bombard_counts_co[color] = self._compute_bombard_counts(color)
+            self.bombarded_co[color] = self.get_bombarded_squares(color)
+
+        self._zobrist = self._compute_zobrist()
+
     def transform(self, f: Callable[[Bitboard], Bitboard]) -> "BaseBoard":
         """
         Returns a transformed copy of the board (without move stack)
         by applying a bitboard transformation function.
 
         Available transformations include :func:`flip_vertical()`,
-        :func:`flip_horizontal()`, :func:`flip_diagonal()`,
-        :func:`flip_anti_diagonal()`, :func:`shift_down()`,
-        :func:`shift_up()`, :func:`shift_left()`, and
-        :func:`shift_right()`.
+        :func:`flip_horizontal()`, :func:`flip_diag_a1h8()` and
+        :func:`rotate_90_clockwise()`.
 
         Alternatively, :func:`~BaseBoard.apply_transform()` can be used
         to apply the transformation on the board.
@@ -1321,8 +1865,11 @@ class BaseBoard:
         self.reserves[RED], self.reserves[BLUE] = self.reserves[BLUE], self.reserves[RED]
         self.occupied_co[RED], self.occupied_co[BLUE] = self.occupied_co[BLUE], self.occupied_co[RED]
         self.bombarded_co[RED], self.bombarded_co[BLUE] = self.bombarded_co[BLUE], self.bombarded_co[RED]
+        self.bombard_counts_co[RED], self.bombard_counts_co[BLUE] = self.bombard_counts_co[BLUE], self.bombard_counts_co[RED]
         self.adjacent_infantry_squares_co[RED], self.adjacent_infantry_squares_co[BLUE] = self.adjacent_infantry_squares_co[BLUE], self.adjacent_infantry_squares_co[RED]
         self.turn = not self.turn
+        self.piece_square_co = [self._compute_piece_square_score(RED), self._compute_piece_square_score(BLUE)]
+        self._zobrist = self._compute_zobrist()
 
     def mirror(self) -> "BaseBoard":
         """
@@ -1355,6 +1902,7 @@ class BaseBoard:
         board.did_accept_draw = self.did_accept_draw
         board.turn_auto_moves = self.turn_auto_moves
         board.move_stack = self.move_stack.copy()
+        board._stack = self._stack.copy()
         board.infantry = self.infantry
         board.armored_infantry = self.armored_infantry
         board.airborne_infantry = self.airborne_infantry
@@ -1367,10 +1915,13 @@ class BaseBoard:
         board.orientation_bit1 = self.orientation_bit1
         board.orientation_bit2 = self.orientation_bit2
         board.bombarded_co = self.bombarded_co.copy()
+        board.bombard_counts_co = self.bombard_counts_co.copy()
         board.adjacent_infantry_squares_co = self.adjacent_infantry_squares_co.copy()
         board.free_capture_clusters = self.free_capture_clusters
         board.free_capture_enemies = self.free_capture_enemies
         board.free_capture_num_allowed = self.free_capture_num_allowed
+        board.piece_square_co = self.piece_square_co and self.piece_square_co.copy()
+        board._zobrist = self._zobrist
         return board
 
     def get_orientation(self, square: Square) -> Optional[Orientation]:
@@ -1390,46 +1941,7 @@ class BaseBoard:
     def get_bombardment_target(self, artillery_square: Square, orientation: Orientation, n_squares = 2) -> Optional[Square]:
         """Get the target square for artillery bombardment based on current square and orientation.
         Returns None if the target square would be off the board."""
-        file = square_file(artillery_square)
-        rank = square_rank(artillery_square)
-        squares = n_squares
-
-        def clamp_to_board(value: int) -> int:
-            return max(0, min(7, value))
-
-        # If it's cardinal directions, we can just clamp the target file or rank
-        if orientation == ORIENT_N:  # North
-            return square(file, clamp_to_board(rank + squares))
-        elif orientation == ORIENT_E:  # East
-            return square(clamp_to_board(file + squares), rank)
-        elif orientation == ORIENT_S:  # South
-            return square(file, clamp_to_board(rank - squares))
-        elif orientation == ORIENT_W:  # West
-            return square(clamp_to_board(file - squares), rank)
-
-        # If it's diagonal directions, we need to work our way back from the target square
-        # TODO(tyler): we could probably have some precomputed lookup table for this
-        def find_valid_diagonal(file_delta: int, rank_delta: int, squares: int) -> Optional[Tuple[int, int]]:
-            target_file, target_rank = file + squares * file_delta, rank + squares * rank_delta
-            while (target_file < 0 or target_file > 7 or target_rank < 0 or target_rank > 7) and squares > 0:
-                squares -= 1
-                target_file, target_rank = file + squares * file_delta, rank + squares * rank_delta
-            return None if squares == 0 else (target_file, target_rank)
-
-        if orientation == ORIENT_NE:  # Northeast
-            result = find_valid_diagonal(1, 1, squares)
-        elif orientation == ORIENT_SE:  # Southeast
-            result = find_valid_diagonal(1, -1, squares)
-        elif orientation == ORIENT_SW:  # Southwest
-            result = find_valid_diagonal(-1, -1, squares)
-        else:  # Northwest
-            result = find_valid_diagonal(-1, 1, squares)
-
-        if result is None:
-            return None
-
-        target_file, target_rank = result
-        return square(target_file, target_rank)
+        return bombardment_target(artillery_square, orientation, n_squares)
 
     def set_orientation(self, square: Square, orientation: Optional[Orientation]) -> None:
         """Set the orientation of a piece at a given square."""
@@ -1498,45 +2010,48 @@ class BaseBoard:
         result = BB_EMPTY
         artillery = (self.artillery | self.heavy_artillery | self.armored_artillery) & self.occupied_co[color]
 
+        bit0, bit1, bit2 = self.orientation_bit0, self.orientation_bit1, self.orientation_bit2
         for square in scan_reversed(artillery):
-            orientation = self.get_orientation(square)
-            if orientation is None:
-                continue
-
-            n_squares = 3 if self.piece_type_at(square) == HEAVY_ARTILLERY else 2
-            target = self.get_bombardment_target(square, orientation, n_squares)
-            if target is not None:
-                result |= between_inclusive_end(square, target)
+            orientation = ((bit0 >> square) & 1) | ((bit1 >> square) & 1) << 1 | ((bit2 >> square) & 1) << 2
+            n_squares = 3 if self.heavy_artillery & BB_SQUARES[square] else 2
+            result |= BB_BOMBARD[n_squares][orientation][square]
 
         return result
 
+    def _bombard_ray(self, square: Square, piece_type: PieceType) -> Bitboard:
+        """Gets the squares bombarded by the artillery on *square*, using its current orientation bits."""
+        orientation = ((self.orientation_bit0 >> square) & 1) | ((self.orientation_bit1 >> square) & 1) << 1 | ((self.orientation_bit2 >> square) & 1) << 2
+        return BB_BOMBARD[3 if piece_type == HEAVY_ARTILLERY else 2][orientation][square]
+
+    def _compute_bombard_counts(self, color: Color) -> BombardCounts:
+        counts = (BB_EMPTY, BB_EMPTY, BB_EMPTY, BB_EMPTY)
+        heavy_artillery = self.heavy_artillery
+        artillery = (self.artillery | self.armored_artillery | heavy_artillery) & self.occupied_co[color]
+
+        bit0, bit1, bit2 = self.orientation_bit0, self.orientation_bit1, self.orientation_bit2
+        for square in scan_reversed(artillery):
+            orientation = ((bit0 >> square) & 1) | ((bit1 >> square) & 1) << 1 | ((bit2 >> square) & 1) << 2
+            counts = _bombard_counts_add(counts, BB_BOMBARD[3 if heavy_artillery >> square & 1 else 2][orientation][square])
+        return counts
+
     def get_adjacent_infantry_squares(self, color: Color) -> Bitboard:
-        result = BB_EMPTY
-        enemy_infantry = self.occupied_co[color] & self._all_infantry()
-        for square in scan_reversed(enemy_infantry):
-            result |= BB_ADJACENT_SQUARES[square]
-        return result
+        return adjacent_squares(self.occupied_co[color] & (self.infantry | self.armored_infantry | self.airborne_infantry))
 
     def generate_legal_moves(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
         our_pieces = self.occupied_co[self.turn] & ~self.turn_pieces
 
         if self.turn_moves == 0:
-            # First look for bombardments, only return those if they exist
-            bombardments = list(self._find_bombardment_moves())
-            if len(bombardments) > 0:
-                yield from bombardments
-                return
-
-            # Then look for all free captures, only return those if they exist
-            free_captures = list(set(self._generate_free_captures(self.turn)))
-            if len(free_captures) > 0:
-                yield from free_captures
+            # Bombardments and then free captures are forced, only return those if they exist
+            forced = False
+            for move in self._generate_forced_moves():
+                forced = True
+                yield move
+            if forced:
                 return
 
         # Get all unoccupied squares and non-bombarded squares
-        bombarded = self.bombarded_co[not self.turn]
         squares_with_adjacent_enemy_infantry = self.adjacent_infantry_squares_co[not self.turn]
-        unoccupied = ~self.occupied & ~bombarded & to_mask
+        unoccupied = self._unoccupied_squares(to_mask)
 
         # add reserve moves
         back_rank = (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied
@@ -1572,8 +2087,203 @@ class BaseBoard:
                 for capture in captures:
                     yield capture
 
-        # artillery moves
-        artillery = (self.artillery | self.heavy_artillery | self.armored_artillery) & our_pieces & from_mask
+        yield from self._generate_artillery_moves(our_pieces & from_mask, unoccupied & to_mask)
+
+        # users can always skip
+        yield Move.skip()
+
+    def generate_staged_moves(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
+        """
+        Generates the same moves as :func:`~BaseBoard.generate_legal_moves()`
+        in stages: forced auto-captures, then moves with a capture, then quiet
+        moves. A stage is only generated once the previous one is exhausted,
+        so a search that stops early never pays for the tail.
+        """
+        if self.turn_moves == 0:
+            forced = False
+            for move in self._generate_forced_moves():
+                forced = True
+                yield move
+            if forced:
+                return
+
+        our_pieces = self.occupied_co[self.turn] & ~self.turn_pieces
+        unoccupied = self._unoccupied_squares(to_mask)
+        back_rank = (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied
+        piece_types = [piece_type for piece_type, _ in self.reserves[self.turn]]
+        infantry = our_pieces & self._all_infantry() & from_mask
+
+        # captures don't depend on the reinforced unit type
+        if piece_types:
+            for to_square in scan_forward(back_rank):
+                for capture_square in list(self._capture_squares(None, to_square)):
+                    for piece_type in piece_types:
+                        yield Move(name="Reinforce", unit_type=piece_type, to_square=to_square, capture_preference=capture_square)
+
+        for from_square in scan_reversed(infantry):
+            for to_square in scan_reversed(self._infantry_destinations(from_square, unoccupied) & to_mask):
+                for capture_square in self._capture_squares(from_square, to_square):
+                    yield Move(name="Move", from_square=from_square, to_square=to_square, capture_preference=capture_square)
+
+        for piece_type in piece_types:
+            for to_square in scan_forward(back_rank):
+                yield Move(name="Reinforce", unit_type=piece_type, to_square=to_square)
+
+        for from_square in scan_reversed(our_pieces & self.hq & from_mask):
+            for to_square in scan_reversed(BB_REGULAR_MOVES[from_square] & unoccupied & to_mask):
+                yield Move(name="Move", from_square=from_square, to_square=to_square)
+
+        for from_square in scan_reversed(infantry):
+            for to_square in scan_reversed(self._infantry_destinations(from_square, unoccupied) & to_mask):
+                yield Move(name="Move", from_square=from_square, to_square=to_square)
+
+        yield from self._generate_artillery_moves(our_pieces & from_mask, unoccupied & to_mask)
+
+        yield Move.skip()
+
+    def count_legal_moves(self) -> int:
+        """
+        Counts the moves :func:`~BaseBoard.generate_legal_moves()` would
+        generate, without creating :class:`~Move` objects.
+        """
+        if self.turn_moves == 0:
+            bombarded = self.bombarded_co[self.turn] & self.occupied_co[not self.turn]
+            if bombarded:
+                return popcount(bombarded)
+
+            free_captures = BB_EMPTY
+            for square in self._free_capture_squares(self.turn):
+                free_captures |= BB_SQUARES[square]
+            if free_captures:
+                return popcount(free_captures)
+
+        our_pieces = self.occupied_co[self.turn] & ~self.turn_pieces
+        unoccupied = self._unoccupied_squares(BB_ALL)
+        count = 1  # skip
+
+        back_rank = (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied
+        num_piece_types = sum(1 for _ in self.reserves[self.turn])
+        if num_piece_types:
+            for to_square in scan_forward(back_rank):
+                count += num_piece_types
+                for _ in self._capture_squares(None, to_square):
+                    count += num_piece_types
+
+        for from_square in scan_reversed(our_pieces & self.hq):
+            count += popcount(BB_REGULAR_MOVES[from_square] & unoccupied)
+
+        for from_square in scan_reversed(our_pieces & self._all_infantry()):
+            for to_square in scan_reversed(self._infantry_destinations(from_square, unoccupied)):
+                count += 1
+                for _ in self._capture_squares(from_square, to_square):
+                    count += 1
+
+        for from_square in scan_reversed(our_pieces & self._all_artillery()):
+            # every rotation except the current one, and every orientation on every destination
+            count += 7 + 8 * popcount(self.artillery_move_mask(from_square) & unoccupied)
+
+        return count
+
+    def generate_legal_moves_packed(self) -> array:
+        """
+        Generates the moves of :func:`~BaseBoard.generate_staged_moves()`,
+        in the same order, as an ``array('I')`` of :data:`PackedMove`.
+        """
+        moves = array("I")
+        for stage in self.generate_staged_moves_packed():
+            moves.extend(stage)
+        return moves
+
+    def generate_staged_moves_packed(self) -> Iterator[array]:
+        """
+        Generates the moves of :func:`~BaseBoard.generate_legal_moves_packed()`
+        one stage at a time, as an ``array('I')`` per stage: forced
+        auto-captures, moves with a capture, quiet moves, artillery moves and
+        the skip. Like :func:`~BaseBoard.generate_staged_moves()`, a stage is
+        only generated once the previous one has been consumed.
+        """
+        if self.turn_moves == 0:
+            bombarded = self.bombarded_co[self.turn] & self.occupied_co[not self.turn]
+            if bombarded:
+                yield array("I", [PACKED_BOMBARD | (square + 1) << 15 for square in scan_reversed(bombarded)])
+                return
+
+            forced = array("I")
+            seen = BB_EMPTY
+            for square in self._free_capture_squares(self.turn):
+                if not seen & BB_SQUARES[square]:
+                    seen |= BB_SQUARES[square]
+                    forced.append(PACKED_FREE_CAPTURE | (square + 1) << 15)
+            if forced:
+                yield forced
+                return
+
+        our_pieces = self.occupied_co[self.turn] & ~self.turn_pieces
+        unoccupied = self._unoccupied_squares(BB_ALL)
+        back_rank = (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied
+        piece_types = [piece_type << 22 for piece_type, _ in self.reserves[self.turn]]
+        infantry = our_pieces & self._all_infantry()
+
+        captures = array("I")
+        append = captures.append
+        if piece_types:
+            for to_square in scan_forward(back_rank):
+                for capture_square in list(self._capture_squares(None, to_square)):
+                    base = PACKED_REINFORCE | to_square << 9 | (capture_square + 1) << 15
+                    for piece_type in piece_types:
+                        append(base | piece_type)
+
+        destinations = array("I")
+        for from_square in scan_reversed(infantry):
+            for to_square in scan_reversed(self._infantry_destinations(from_square, unoccupied)):
+                base = PACKED_MOVE | from_square << 3 | to_square << 9
+                destinations.append(base)
+                for capture_square in self._capture_squares(from_square, to_square):
+                    append(base | (capture_square + 1) << 15)
+        yield captures
+
+        quiet = array("I")
+        append = quiet.append
+        for piece_type in piece_types:
+            for to_square in scan_forward(back_rank):
+                append(PACKED_REINFORCE | to_square << 9 | piece_type)
+
+        for from_square in scan_reversed(our_pieces & self.hq):
+            for to_square in scan_reversed(BB_REGULAR_MOVES[from_square] & unoccupied):
+                append(PACKED_MOVE | from_square << 3 | to_square << 9)
+
+        quiet.extend(destinations)
+        yield quiet
+
+        artillery_moves = array("I")
+        append = artillery_moves.append
+        artillery = (self.artillery | self.heavy_artillery | self.armored_artillery) & our_pieces
+        for from_square in scan_reversed(artillery):
+            previous_orientation = self.get_orientation(from_square)
+            base = PACKED_MOVE_AND_ORIENT | from_square << 3
+            for orientation in range(8):
+                if orientation != previous_orientation:
+                    append(base | from_square << 9 | (orientation + 1) << 25)
+
+            for to_square in scan_reversed(self.artillery_move_mask(from_square) & unoccupied):
+                for orientation in range(8):
+                    append(base | to_square << 9 | (orientation + 1) << 25)
+        yield artillery_moves
+
+        yield array("I", [PACKED_SKIP])
+
+    def _unoccupied_squares(self, to_mask: Bitboard) -> Bitboard:
+        return ~self.occupied & ~self.bombarded_co[not self.turn] & to_mask
+
+    def _infantry_destinations(self, from_square: Square, unoccupied: Bitboard) -> Bitboard:
+        # if the infantry piece is on a square with adjacent enemy infantry, we can't move it to a square with adjacent enemy infantry
+        squares_with_adjacent_enemy_infantry = self.adjacent_infantry_squares_co[not self.turn]
+        if BB_SQUARES[from_square] & squares_with_adjacent_enemy_infantry:
+            unoccupied &= ~squares_with_adjacent_enemy_infantry
+        return self.infantry_move_mask(from_square) & unoccupied
+
+    def _generate_artillery_moves(self, from_mask: Bitboard, to_mask: Bitboard) -> Iterator[Move]:
+        artillery = (self.artillery | self.heavy_artillery | self.armored_artillery) & from_mask
         for from_square in scan_reversed(artillery):
             # artillery can stay in place and rotate in any direction except their previous orientation
             previous_orientation = self.get_orientation(from_square)
@@ -1583,21 +2293,40 @@ class BaseBoard:
                 yield Move.move_and_orient(from_square, from_square, orientation)
 
             # artillery can move and rotate in any direction
-            moves = self.artillery_move_mask(from_square) & unoccupied & to_mask
+            moves = self.artillery_move_mask(from_square) & to_mask
             for to_square in scan_reversed(moves):
                 for orientation in range(8):
                     yield Move.move_and_orient(from_square, to_square, orientation)
 
-        # users can always skip
-        yield Move.skip()
+    def _generate_forced_moves(self) -> Iterator[Move]:
+        # First look for bombardments, only return those if they exist
+        if self.bombarded_co[self.turn] & self.occupied_co[not self.turn]:
+            yield from self._find_bombardment_moves()
+            return
+
+        # Then look for all free captures
+        seen = BB_EMPTY
+        for square in self._free_capture_squares(self.turn):
+            if not seen & BB_SQUARES[square]:
+                seen |= BB_SQUARES[square]
+                yield Move.auto_capture_free(square)
 
     def generate_legal_captures(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
         our_artillery = self.occupied_co[self.turn] & self._all_artillery()
         return self.generate_legal_moves(from_mask & ~our_artillery, to_mask)
 
     def _generate_captures(self, move: Move) -> Iterator[Move]:
+        from_square = move.from_square if move.name == "Move" else None
+        for square in self._capture_squares(from_square, move.to_square):
+            yield move.with_capture(square)
+
+    def _capture_squares(self, from_square: Optional[Square], to_square: Square) -> Iterator[Square]:
+        """
+        Yields the enemies that may be captured by an infantry move from
+        *from_square* (or a reinforcement, if ``None``) to *to_square*.
+        """
         color = self.turn
-        free_capture_clusters, free_capture_enemies, free_capture_num_allowed = self._find_free_captures(color, move)
+        free_capture_clusters, free_capture_enemies, free_capture_num_allowed = self._find_free_captures(color, to_square, from_square)
 
         if free_capture_clusters == BB_EMPTY and free_capture_enemies == BB_EMPTY and free_capture_num_allowed == BB_EMPTY:
             return
@@ -1610,21 +2339,21 @@ class BaseBoard:
                 continue
 
             # skip if we're not moving into this cluster
-            if not (cluster & BB_SQUARES[move.to_square]):
+            if not (cluster & BB_SQUARES[to_square]):
                 continue
 
             capturable_enemies = free_capture_enemies & cluster & self.occupied_co[not color]
             for square in scan_reversed(capturable_enemies):
                 # skip if the enemy is not adjacent to the move's to square
-                if not (BB_ADJACENT_SQUARES[move.to_square] & BB_SQUARES[square]):
+                if not (BB_ADJACENT_SQUARES[to_square] & BB_SQUARES[square]):
                     continue
 
                 if self.piece_type_at(square) == HQ:
                     hq_attacker_count += 1 if num_allowed == 1 else 2
                     if hq_attacker_count > 1:
-                        yield move.with_capture(square)
+                        yield square
                 else:
-                    yield move.with_capture(square)
+                    yield square
 
     def _find_adjacent_attackable_squares(self, engaged: Tuple[Bitboard, Bitboard], attacker_from: Square | None, attacker_to: Square) -> Bitboard:
         attacker_color = self.color_at(attacker_to)
@@ -1740,48 +2469,92 @@ class BaseBoard:
         Updates the position with the given *move* and puts it onto the
         move stack.
 
-        TODO(tyler): add board state to board state stack
+        The position before the move is saved on the board state stack, so
+        the move can be taken back with :func:`~BaseBoard.pop()`.
+        """
+        if move.name == "AutoCapture":
+            if move.auto_capture_type == "free":
+                kind = PACKED_FREE_CAPTURE
+            elif move.auto_capture_type == "bombard":
+                kind = PACKED_BOMBARD
+            else:
+                kind = 0
+        else:
+            kind = _PACKED_KINDS[move.name]
+        self._push(move, kind, move.from_square, move.to_square, move.unit_type, move.orientation, move.capture_preference)
+
+    def push_packed(self, packed: PackedMove) -> None:
+        """
+        Like :func:`~BaseBoard.push()`, but for a :data:`PackedMove`, without
+        unpacking it into a :class:`~Move`. The packed move is kept with the
+        saved position rather than on :attr:`move_stack`, so the move stack
+        only ever holds :class:`~Move` objects. Take it back with
+        :func:`~BaseBoard.pop_packed()` or :func:`~BaseBoard.pop()`.
         """
-        self.move_stack.append(move)
+        capture = packed >> 15 & 127
+        orientation = packed >> 25 & 15
+        self._push(
+            packed,
+            packed & 7,
+            packed >> 3 & 63,
+            packed >> 9 & 63 if packed & 7 != PACKED_SKIP else None,
+            packed >> 22 & 7,
+            orientation - 1 if orientation else None,
+            capture - 1 if capture else None,
+        )
+
+    def _push(self, move: Union[Move, PackedMove], kind: int, from_square: Optional[Square], to_square: Optional[Square],
+              unit_type: Optional[PieceType], orientation: Optional[int], capture: Optional[Square]) -> None:
+        self._ensure_incremental_state()
+        state = _BoardState(self)
+        self._stack.append(state)
+        if type(move) is int:
+            state.packed = move
+        else:
+            self.move_stack.append(move)
 
         # Move pieces from one square to the next
-        if move.name == "Move":
-            self._move_piece(move)
-            self._do_captures(move)
-            self.did_offer_draw = False
-        elif move.name == "MoveAndOrient":
-            self._move_piece(move)
+        if kind == PACKED_MOVE or kind == PACKED_MOVE_AND_ORIENT:
+            self._move_piece(from_square, to_square, orientation)
+            if capture is not None:
+                self._remove_piece_at(capture)
             self.did_offer_draw = False
-        elif move.name == "Reinforce":
-            orientation = ORIENT_N if self.turn == RED else ORIENT_S
-            self.reserves[self.turn].remove(move.unit_type)
-            self._set_piece_at(move.to_square, move.unit_type, self.turn, orientation)
-            self._do_captures(move)
+        elif kind == PACKED_REINFORCE:
+            self.reserves[self.turn].remove(unit_type)
+            self._stack[-1].reinforced = unit_type
+            self._set_piece_at(to_square, unit_type, self.turn, ORIENT_N if self.turn == RED else ORIENT_S)
+            if capture is not None:
+                self._remove_piece_at(capture)
             self.did_offer_draw = False
-        elif move.name == "Skip":
+        elif kind == PACKED_SKIP:
             if self.did_offer_draw:
                 self.did_accept_draw = True
             else:
                 self.did_offer_draw = self.turn_moves == 0
-        elif move.name == "AutoCapture":
-            if move.auto_capture_type == "free":
-                self._do_captures(move)
-                self._record_free_capture(move)
-            elif move.auto_capture_type == "bombard":
-                self._do_captures(move)
+        else:
+            if kind == PACKED_FREE_CAPTURE:
+                if capture is None:
+                    raise ValueError(f"invalid free capture: {move}")
+                self._remove_piece_at(capture)
+                self._record_free_capture(capture)
+            elif kind == PACKED_BOMBARD and capture is not None:
+                self._remove_piece_at(capture)
 
             self.turn_auto_moves += 1
             return
 
         # Increment turn moves.
+        self._zobrist ^= ZOBRIST_TURN_MOVES[self.turn_moves] ^ ZOBRIST_TURN_MOVES[self.turn_moves + 1]
         self.turn_moves += 1
 
         # Mark this piece as moved so we can't move it again this turn
-        if move.to_square is not None:
-            self.turn_pieces |= BB_SQUARES[move.to_square]
+        if to_square is not None and not self.turn_pieces & BB_SQUARES[to_square]:
+            self._zobrist ^= ZOBRIST_TURN_PIECES[to_square]
+            self.turn_pieces |= BB_SQUARES[to_square]
 
         # Swap turn.
-        if self.turn_moves == 3 or move.name == "Skip":
+        if self.turn_moves == 3 or kind == PACKED_SKIP:
+            self._zobrist ^= ZOBRIST_TURN ^ ZOBRIST_TURN_MOVES[self.turn_moves] ^ _zobrist_squares(ZOBRIST_TURN_PIECES, self.turn_pieces)
             self.turn = not self.turn
             self.turn_moves = 0
             self.turn_auto_moves = 0
@@ -1791,14 +2564,52 @@ class BaseBoard:
             # HACK: generate free captures to set up the internal board state
             list(self._generate_free_captures(self.turn))
 
-    def _move_piece(self, move: Move) -> None:
-        piece_type = self._remove_piece_at(move.from_square)
-        assert piece_type is not None, f"push() expects move to be pseudo-legal, but got {move} in {self.board_fen()}"
-        self._set_piece_at(move.to_square, piece_type, self.turn, move.orientation)
+    def pop(self) -> Move:
+        """
+        Restores the previous position and returns the last move from the stack.
+        A move made with :func:`~BaseBoard.push_packed()` is unpacked.
 
-    def _do_captures(self, move: Move) -> None:
-        if move.capture_preference is not None:
-            self._remove_piece_at(move.capture_preference)
+        :raises: :exc:`IndexError` if the move stack is empty.
+        """
+        state = self._stack.pop()
+        move = self.move_stack.pop() if state.packed is None else Move.from_packed(state.packed)
+        if state.reinforced is not None:
+            self.reserves[state.turn].add(state.reinforced)
+        state.restore(self)
+        return move
+
+    def pop_packed(self) -> PackedMove:
+        """
+        Like :func:`~BaseBoard.pop()`, but takes back a move made with
+        :func:`~BaseBoard.push_packed()` and returns it without unpacking.
+
+        :raises: :exc:`IndexError` if the move stack is empty, or
+            :exc:`ValueError` if the last move was made with
+            :func:`~BaseBoard.push()`.
+        """
+        state = self._stack[-1]
+        if state.packed is None:
+            raise ValueError("last move was not pushed with push_packed()")
+        self._stack.pop()
+        if state.reinforced is not None:
+            self.reserves[state.turn].add(state.reinforced)
+        state.restore(self)
+        return state.packed
+
+    def peek(self) -> Move:
+        """
+        Gets the last move from the move stack.
+
+        :raises: :exc:`IndexError` if the move stack is empty.
+        """
+        if self._stack and self._stack[-1].packed is not None:
+            return Move.from_packed(self._stack[-1].packed)
+        return self.move_stack[-1]
+
+    def _move_piece(self, from_square: Square, to_square: Square, orientation: Optional[int]) -> None:
+        piece_type = self._remove_piece_at(from_square)
+        assert piece_type is not None, f"push() expects move to be pseudo-legal, but got {SQUARE_NAMES[from_square]}{SQUARE_NAMES[to_square]} in {self.board_fen()}"
+        self._set_piece_at(to_square, piece_type, self.turn, orientation)
 
     def _find_bombardment_moves(self) -> Iterator[Move]:
         bombarded_squares = self.bombarded_co[self.turn]
@@ -1808,23 +2619,25 @@ class BaseBoard:
             yield Move.auto_capture_bombard(square)
 
     def _remove_bombarded_pieces(self) -> None:
-        for move in self._find_bombardment_moves():
+        for move in list(self._find_bombardment_moves()):
+            self._stack.append(_BoardState(self))
             self.move_stack.append(move)
             self._remove_piece_at(move.capture_preference)
 
-    def _record_free_capture(self, move: Move) -> None:
-        if move.auto_capture_type != "free" or move.capture_preference is None:
-            raise ValueError(f"invalid free capture: {move}")
-
-        capture_square = move.capture_preference
-
+    def _record_free_capture(self, capture_square: Square) -> None:
         for cluster in find_clusters(self.free_capture_clusters):
             if cluster & BB_SQUARES[capture_square]:
                 msb_pos = msb(self.free_capture_num_allowed & cluster) # remove one from this cluster of allowed captures
+                if self.free_capture_num_allowed & BB_SQUARES[msb_pos]:
+                    self._zobrist ^= ZOBRIST_FREE_CAPTURE_NUM_ALLOWED[msb_pos]
                 self.free_capture_num_allowed &= ~BB_SQUARES[msb_pos]
                 break
 
-    def _generate_free_captures(self, color: Color):
+    def _generate_free_captures(self, color: Color) -> Iterator[Move]:
+        for square in self._free_capture_squares(color):
+            yield Move.auto_capture_free(square)
+
+    def _free_capture_squares(self, color: Color) -> Iterator[Square]:
         if self.turn_moves != 0:
             return
 
@@ -1833,6 +2646,8 @@ class BaseBoard:
             self.free_capture_clusters = free_capture_clusters
             self.free_capture_enemies = free_capture_enemies
             self.free_capture_num_allowed = free_capture_num_allowed
+            if self._zobrist is not None:
+                self._zobrist ^= _zobrist_free_captures(free_capture_clusters, free_capture_enemies, free_capture_num_allowed)
 
         if self.free_capture_clusters == BB_EMPTY and self.free_capture_enemies == BB_EMPTY and self.free_capture_num_allowed == BB_EMPTY:
             return
@@ -1849,11 +2664,11 @@ class BaseBoard:
                 if self.piece_type_at(square) == HQ:
                     hq_attacker_count += 1 if num_allowed == 1 else 2
                     if hq_attacker_count > 1:
-                        yield Move.auto_capture_free(square)
+                        yield square
                 else:
-                    yield Move.auto_capture_free(square)
+                    yield square
 
-    def _find_free_captures(self, color: Color, move: Optional[Move] = None):
+    def _find_free_captures(self, color: Color, to_square: Optional[Square] = None, from_square: Optional[Square] = None):
         free_capture_clusters = BB_EMPTY
         free_capture_enemies = BB_EMPTY
         free_capture_num_allowed = BB_EMPTY
@@ -1861,20 +2676,15 @@ class BaseBoard:
         all_units = self._all_infantry()
         occupied_co = self.occupied_co.copy()
 
-        if move is not None:
-            to_square = move.to_square
-
+        if to_square is not None:
             # short circuit if the to_square isn't adjacent to any enemy pieces
             if not (BB_ADJACENT_SQUARES[to_square] & occupied_co[not color]):
                 return BB_EMPTY, BB_EMPTY, BB_EMPTY
 
-            if move.name != "Move" and move.name != "Reinforce":
-                # short circuit if we're not making a move
-                return BB_EMPTY, BB_EMPTY, BB_EMPTY
-            if move.name == "Move":
+            if from_square is not None:
                 # remove the piece from its original square square
-                all_units &= ~BB_SQUARES[move.from_square]
-                occupied_co[color] &= ~BB_SQUARES[move.from_square]
+                all_units &= ~BB_SQUARES[from_square]
+                occupied_co[color] &= ~BB_SQUARES[from_square]
 
             all_units |= BB_SQUARES[to_square]
             occupied_co[color] |= BB_SQUARES[to_square]
@@ -1916,63 +2726,158 @@ class BaseBoard:
         return [capturable_enemies, num_captures_board]
 
     def _find_adjacency_clusters(self, occupied_co: Tuple[Bitboard, Bitboard], all_units: Bitboard):
-        visited = BB_EMPTY
-
         while all_units:
-            # Find the first unvisited unit (lowest bit)
+            # Start a cluster from the first unvisited unit (lowest bit)
             start = all_units & -all_units
-            if not start:
-                break
+            all_units ^= start
 
-            # Get color of starting unit
-            start_color = self.color_at(lsb(start), occupied_co)
-            if start_color is None:
+            if occupied_co[RED] & start:
+                current_color = RED
+            elif occupied_co[BLUE] & start:
+                current_color = BLUE
+            else:
                 continue
 
-            # Initialize cluster with this unit
             cluster = start
             frontier = start
-            visited |= start
-            current_color = start_color
 
-            # Flood fill
+            # Flood fill one whole frontier per step. The frontier always holds
+            # units of a single color and only grows into the opposite color.
             while frontier:
-                # Get all adjacent squares to current frontier
-                adjacent = BB_EMPTY
-                for square in scan_reversed(frontier):
-                    # Expand to squares of opposite color
-                    adjacent |= BB_ADJACENT_SQUARES[square] & occupied_co[not current_color]
-
-                # Find new units to add to cluster
-                new_units = adjacent & all_units & ~visited
-                cluster |= new_units
-                visited |= new_units
-                frontier = new_units
-
-                # Flip color for next iteration
                 current_color = not current_color
+                frontier = adjacent_squares(frontier) & occupied_co[current_color] & all_units
+                cluster |= frontier
+                all_units ^= frontier
 
             yield cluster
-            all_units &= ~visited
 
     def is_legal(self, move: Move) -> bool:
-        return move in self.generate_legal_moves()
+        """
+        Checks if *move* is one of the moves generated by
+        :func:`~BaseBoard.generate_legal_moves()`, validating just that move
+        instead of enumerating all of them.
+        """
+        name = move.name
+        for square in (move.from_square, move.to_square, move.capture_preference):
+            if square is not None and not 0 <= square < 64:
+                return False
+
+        if self.turn_moves == 0:
+            # forced auto-captures exclude every other move
+            bombarded = self.bombarded_co[self.turn] & self.occupied_co[not self.turn]
+            if bombarded:
+                return (name == "AutoCapture" and move.auto_capture_type == "bombard" and _is_bare_capture(move)
+                        and bool(bombarded & BB_SQUARES[move.capture_preference]))
+
+            free_captures = BB_EMPTY
+            for square in self._free_capture_squares(self.turn):
+                free_captures |= BB_SQUARES[square]
+            if free_captures:
+                return (name == "AutoCapture" and move.auto_capture_type == "free" and _is_bare_capture(move)
+                        and bool(free_captures & BB_SQUARES[move.capture_preference]))
+
+        if name == "Skip":
+            return move == Move.skip()
+
+        if move.to_square is None or move.auto_capture_type is not None:
+            return False
+
+        to_square = move.to_square
+        to_mask = BB_SQUARES[to_square]
+        unoccupied = self._unoccupied_squares(BB_ALL)
+
+        if name == "Reinforce":
+            back_rank = (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied
+            if move.from_square is not None or move.orientation is not None or move.unit_type is None:
+                return False
+            if not back_rank & to_mask or not self.reserves[self.turn].get_count(move.unit_type):
+                return False
+            return move.capture_preference is None or move.capture_preference in self._capture_squares(None, to_square)
+
+        if move.from_square is None or move.unit_type is not None:
+            return False
+
+        from_square = move.from_square
+        from_mask = BB_SQUARES[from_square]
+        if not self.occupied_co[self.turn] & ~self.turn_pieces & from_mask:
+            return False
+
+        if name == "Move":
+            if move.orientation is not None:
+                return False
+            if self.hq & from_mask:
+                return move.capture_preference is None and bool(BB_REGULAR_MOVES[from_square] & unoccupied & to_mask)
+            if self._all_infantry() & from_mask:
+                if not self._infantry_destinations(from_square, unoccupied) & to_mask:
+                    return False
+                return move.capture_preference is None or move.capture_preference in self._capture_squares(from_square, to_square)
+            return False
+
+        if name == "MoveAndOrient":
+            if move.capture_preference is not None or move.orientation not in range(8) or not self._all_artillery() & from_mask:
+                return False
+            if from_square == to_square:
+                return move.orientation != self.get_orientation(from_square)
+            return bool(self.artillery_move_mask(from_square) & unoccupied & to_mask)
+
+        return False
 
     def is_game_over(self) -> bool:
         return self.outcome() is not None
 
     def outcome(self) -> Optional[Outcome]:
+        """
+        Checks if the game is over. Results are memoized by
+        :func:`~BaseBoard.zobrist_hash()`, so asking again about the same
+        position, even on another board instance, is a dict lookup.
+        """
+        key = self.zobrist_hash()
+        try:
+            return _outcome_cache[key]
+        except KeyError:
+            pass
+
+        outcome = self._outcome()
+        if len(_outcome_cache) >= OUTCOME_CACHE_SIZE:
+            del _outcome_cache[next(iter(_outcome_cache))]
+        _outcome_cache[key] = outcome
+        return outcome
+
+    def _outcome(self) -> Optional[Outcome]:
         if self._is_hq_captured(RED):
             return Outcome("hq capture", BLUE)
         if self._is_hq_captured(BLUE):
             return Outcome("hq capture", RED)
-        if self.turn_moves == 0 and not any(self.generate_legal_moves()):
+        if self.turn_moves == 0 and not self._has_non_skip_move():
             return Outcome("stalemate", None)
         if self.did_offer_draw and self.did_accept_draw:
             return Outcome("double skip", None)
 
         return None
 
+    def _has_non_skip_move(self) -> bool:
+        # same answer as any(self.generate_legal_moves()), from the move masks alone
+        if self.turn_moves == 0:
+            if self.bombarded_co[self.turn] & self.occupied_co[not self.turn]:
+                return True
+            for _ in self._free_capture_squares(self.turn):
+                return True
+
+        our_pieces = self.occupied_co[self.turn] & ~self.turn_pieces
+        if our_pieces & self._all_artillery():
+            return True  # artillery can always rotate
+
+        unoccupied = self._unoccupied_squares(BB_ALL)
+        if any(True for _ in self.reserves[self.turn]) and (BB_RANK_1 if self.turn == RED else BB_RANK_8) & unoccupied:
+            return True
+        for from_square in scan_reversed(our_pieces & self.hq):
+            if BB_REGULAR_MOVES[from_square] & unoccupied:
+                return True
+        for from_square in scan_reversed(our_pieces & self._all_infantry()):
+            if self._infantry_destinations(from_square, unoccupied):
+                return True
+        return False
+
     def _is_hq_captured(self, color: Color) -> bool:
         return popcount(self.hq & self.occupied_co[color]) == 0
 
@@ -1995,6 +2900,32 @@ class BaseBoard:
         return False
 
 
+OUTCOME_CACHE_SIZE = 4096
+_outcome_cache: Dict[int, Optional[Outcome]] = {}
+
+BOARD_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=BOARD_CACHE_SIZE)
+def _deserialize_cached(data: str) -> BaseBoard:
+    # The cached boards are shared and must never be modified, callers get copies.
+    return BaseBoard._deserialize(data)
+
+
+def board_cache_info() -> Dict[str, int]:
+    """
+    Returns the ``hits``, ``misses``, ``size`` and ``maxsize`` of the cache
+    used by :func:`BaseBoard.deserialize()`.
+    """
+    info = _deserialize_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def clear_board_cache() -> None:
+    """Empties the cache used by :func:`BaseBoard.deserialize()` and resets its counters."""
+    _deserialize_cached.cache_clear()
+
+
 IntoSquareSet: TypeAlias = Union[SupportsInt, Iterable[Square]]
 
 class SquareSet:
@@ -2351,32 +3282,104 @@ class SquareSet:
 
 
 def find_clusters(board: Bitboard):
-    all_units = board
-    visited = BB_EMPTY
+    """Yields the orthogonally connected groups of squares in *board*."""
+    remaining = board
 
-    while all_units:
-        start = all_units & -all_units
-        if not start:
-            break
-
-        cluster = start
-        frontier = start
-        visited |= start
+    while remaining:
+        cluster = frontier = remaining & -remaining
+        remaining ^= frontier
 
         while frontier:
-            adjacent = BB_EMPTY
-            for square in scan_reversed(frontier):
-                adjacent |= BB_ADJACENT_SQUARES[square] & board
-
-            new_units = adjacent & all_units & ~visited
-            cluster |= new_units
-            visited |= new_units
-            frontier = new_units
+            frontier = adjacent_squares(frontier) & remaining
+            cluster |= frontier
+            remaining ^= frontier
 
         yield cluster
-        all_units &= ~visited
 
-import random
+
+Bound: TypeAlias = int
+BOUND_EXACT: Bound = 0
+BOUND_LOWER: Bound = 1
+BOUND_UPPER: Bound = 2
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results keyed by :func:`BaseBoard.zobrist_hash()`.
+
+    Entries live in flat arrays sized from *size_mb* and are grouped in
+    buckets of two slots: the first slot keeps the deepest result seen for
+    the bucket, the second always takes the newest one. Entries written
+    before the last :func:`~TranspositionTable.new_search()` are replaced
+    first.
+    """
+
+    BYTES_PER_ENTRY = 23  # key, score, depth, bound, age and a packed best move
+
+    def __init__(self, size_mb: float = 16) -> None:
+        buckets = 1
+        while buckets * 4 * self.BYTES_PER_ENTRY <= size_mb * 1024 * 1024:
+            buckets *= 2
+
+        self.size = buckets * 2
+        self._mask = buckets - 1
+        self._age = 1
+        self.clear()
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self._keys = array("Q", bytes(8 * self.size))
+        self._scores = array("d", bytes(8 * self.size))
+        self._depths = array("B", bytes(self.size))
+        self._bounds = array("B", bytes(self.size))
+        self._ages = array("B", bytes(self.size))  # 0 marks an empty slot
+        self._moves = array("I", bytes(4 * self.size))  # 0 means no move
+
+    def new_search(self) -> None:
+        """Marks all current entries as stale, so they are replaced first."""
+        self._age = self._age % 255 + 1
+
+    def probe(self, key: int) -> Optional[Tuple[int, float, Bound, PackedMove]]:
+        """
+        Returns ``(depth, score, bound, best_move)`` for *key*, if stored. The
+        best move is packed and ``0`` if there is none.
+        """
+        i = (key & self._mask) << 1
+        for slot in (i, i + 1):
+            if self._ages[slot] and self._keys[slot] == key:
+                return self._depths[slot], self._scores[slot], self._bounds[slot], self._moves[slot]
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: Bound, move: PackedMove = 0) -> None:
+        i = (key & self._mask) << 1
+        ages = self._ages
+
+        if ages[i] and self._keys[i] == key:
+            slot = i
+        elif ages[i + 1] and self._keys[i + 1] == key:
+            slot = i + 1
+        elif not ages[i] or ages[i] != self._age or depth >= self._depths[i]:
+            slot = i
+        else:
+            slot = i + 1
+
+        if ages[slot] and self._keys[slot] == key:
+            # keep deeper results from this search unless the new one is exact
+            if ages[slot] == self._age and depth < self._depths[slot] and bound != BOUND_EXACT:
+                return
+            if not move:
+                move = self._moves[slot]
+
+        self._keys[slot] = key
+        self._scores[slot] = score
+        self._depths[slot] = min(depth, 255)
+        self._bounds[slot] = bound
+        ages[slot] = self._age
+        self._moves[slot] = move
+
+    def hashfull(self) -> int:
+        """Returns the permille of the first 1000 slots used by the current search."""
+        n = min(1000, self.size)
+        return sum(1 for age in self._ages[:n] if age == self._age) * 1000 // n
 
 
 class RandomPlayer():
@@ -2393,14 +3396,14 @@ class ValuePlayer():
         self.board = board
 
     def get_next_move(self):
-        moves = self.board.generate_legal_moves()
+        moves = list(self.board.generate_legal_moves())
         best_move = None
         best_value = float("-inf")
 
         for m1 in moves:
-            b1 = self.board.copy()
-            b1.push(m1)
-            v = -1 * evaluate_board(b1)
+            self.board.push(m1)
+            v = -1 * evaluate_board(self.board)
+            self.board.pop()
             if v > best_value:
                 best_value = v
                 best_move = m1
@@ -2408,6 +3411,163 @@ class ValuePlayer():
         return best_move
 
 
+SEARCH_WIN_SCORE = 100_000.0
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class SearchPlayer():
+    """
+    Negamax alpha-beta search with iterative deepening.
+
+    Depth is counted in individual moves. Scores are from the point of view
+    of the side to move and only change sign when the turn passes to the
+    other player, so all moves of a turn are searched by the same
+    maximizing side. The search never runs past *max_time_ms*; when it is
+    interrupted it returns the best move found so far.
+    """
+
+    def __init__(self, board, max_time_ms: float = 1000, max_depth: int = 6, tt: Optional[TranspositionTable] = None):
+        self.board = board
+        self.max_time_ms = max_time_ms
+        self.max_depth = max_depth
+        self.tt = tt if tt is not None else TranspositionTable()
+
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0.0
+        self._deadline = 0.0
+        self._root_best: PackedMove = 0
+
+    def get_next_move(self):
+        self._deadline = time.perf_counter() + self.max_time_ms / 1000
+        self.tt.new_search()
+        self.nodes = 0
+        self.depth = 0
+
+        root_ply = len(self.board._stack)
+        moves = self.board.generate_legal_moves_packed()
+        best_move = moves[0]
+        if len(moves) == 1:
+            return Move.from_packed(best_move)
+
+        for depth in range(1, self.max_depth + 1):
+            self._root_best = 0
+            try:
+                self.score = self._search(depth, 0, float("-inf"), float("inf"), moves)
+            except _SearchTimeout:
+                while len(self.board._stack) > root_ply:
+                    self.board.pop()
+                # the previous best move is searched first, so a partial iteration can only improve on it
+                if self._root_best:
+                    best_move = self._root_best
+                break
+
+            best_move = self._root_best
+            self.depth = depth
+
+            # search the principal move first in the next iteration
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        return Move.from_packed(best_move)
+
+    def _search(self, depth: int, ply: int, alpha: float, beta: float, root_moves: Optional[array] = None) -> float:
+        self.nodes += 1
+        if time.perf_counter() >= self._deadline:
+            raise _SearchTimeout()
+
+        board = self.board
+        if board._is_hq_captured(board.turn):
+            return -SEARCH_WIN_SCORE + ply
+        if board._is_hq_captured(not board.turn):
+            return SEARCH_WIN_SCORE - ply
+        if board.did_offer_draw and board.did_accept_draw:
+            return 0.0
+
+        key = board.zobrist_hash()
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_bound, tt_move = entry
+            if ply > 0 and tt_depth >= depth:
+                if tt_bound == BOUND_EXACT:
+                    return tt_score
+                if tt_bound == BOUND_LOWER:
+                    alpha = max(alpha, tt_score)
+                elif tt_bound == BOUND_UPPER:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_score
+
+        if depth <= 0:
+            score = self._evaluate()
+            self.tt.store(key, 0, score, BOUND_EXACT)
+            return score
+
+        if root_moves is not None:
+            moves = root_moves
+        else:
+            if board.turn_moves == 0 and not board._has_non_skip_move():
+                return 0.0  # stalemate
+            moves = self._ordered_moves(tt_move)
+
+        original_alpha = alpha
+        best_score = float("-inf")
+        best_move = 0
+        turn = board.turn
+
+        for move in moves:
+            board.push_packed(move)
+            if board.turn == turn:
+                score = self._search(depth - 1, ply + 1, alpha, beta)
+            else:
+                score = -self._search(depth - 1, ply + 1, -beta, -alpha)
+            board.pop_packed()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self._root_best = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            bound = BOUND_UPPER
+        elif best_score >= beta:
+            bound = BOUND_LOWER
+        else:
+            bound = BOUND_EXACT
+        self.tt.store(key, depth, best_score, bound, best_move)
+
+        return best_score
+
+    def _ordered_moves(self, tt_move: PackedMove) -> Iterator[PackedMove]:
+        # the best move from the table is searched before any move is generated,
+        # captures then come before quiet moves and later stages are only
+        # generated if no earlier move caused a cutoff
+        board = self.board
+        if tt_move and board.is_legal(Move.from_packed(tt_move)):
+            yield tt_move
+        else:
+            tt_move = 0
+
+        for stage in board.generate_staged_moves_packed():
+            for move in stage:
+                if move != tt_move:
+                    yield move
+
+    def _evaluate(self) -> float:
+        board = self.board
+        score = evaluate_board(board)
+        return score if board.turn == RED else -score
+
+
 PIECE_VALUES: Dict[PieceType, float] = {
     HQ: 100,
     INFANTRY: 1,
@@ -2435,39 +3595,370 @@ POSITION_GRADIENTS = {
     BLUE: POSITION_GRADIENT[::-1],
 }
 
+def _position_multiplier(piece_type: PieceType) -> float:
+    if piece_type == AIRBORNE_INFANTRY:
+        return -3
+    if piece_type == HQ:
+        return -0.2
+    return 1 if is_artillery(piece_type) else 0.5
+
+PIECE_SQUARE_SCALE = 1000
+"""Piece-square scores are integer multiples of ``1 / PIECE_SQUARE_SCALE`` points, so updating them never drifts."""
+
+PIECE_SQUARE_SCORES: List[List[List[int]]] = [
+    [[0] * 64] + [
+        [round((PIECE_VALUES[piece_type] + POSITION_GRADIENTS[color][square] * _position_multiplier(piece_type)) * PIECE_SQUARE_SCALE) for square in SQUARES]
+        for piece_type in PIECE_TYPES
+    ]
+    for color in COLORS
+]
+"""Material plus position score of a piece, indexed by ``[color][piece_type][square]``. Derived from :data:`PIECE_VALUES` and :data:`POSITION_GRADIENTS`."""
+
+BOMBARDED_SQUARE_SCORES: List[List[int]] = [
+    [round(POSITION_GRADIENTS[color][square] * PIECE_SQUARE_SCALE) for square in SQUARES]
+    for color in COLORS
+]
+"""Score of a square bombarded by a color, indexed by ``[color][square]``."""
+
 def evaluate_board(board: BaseBoard) -> float:
-    return _get_color_score(board, RED) - _get_color_score(board, BLUE)
+    """
+    Scores the position for red, without modifying *board*. Pieces standing
+    on squares the opponent bombards and pieces the opponent can take with
+    free captures are counted as already lost.
+    """
+    return (_get_color_score(board, RED) - _get_color_score(board, BLUE)) / PIECE_SQUARE_SCALE
 
-def _get_color_score(board: BaseBoard, color: Color) -> float:
-    score = 0
+def _get_color_score(board: BaseBoard, color: Color) -> int:
+    # material and piece-square terms are kept up to date by the board, only the pending losses are taken off
+    if board.piece_square_co is None:
+        board.piece_square_co = [board._compute_piece_square_score(RED), board._compute_piece_square_score(BLUE)]
+    score = board.piece_square_co[color]
 
-    # switch the turn to trigger bombardments and so we can evaluate captures
-    if board.turn == color:
-        board.push(Move.skip())
+    lost = _pending_losses(board, color)
+    if lost:
+        scores = PIECE_SQUARE_SCORES[color]
+        for square in scan_reversed(lost):
+            score -= scores[board.piece_type_at(square)][square]
 
-    while True:
-        moves = board.generate_legal_captures()
+    bombarded_scores = BOMBARDED_SQUARE_SCORES[color]
+    for square in scan_reversed(_bombarded_after_losses(board, color, lost)):
+        score += bombarded_scores[square]
 
-        for move in moves:
-            if move.capture_preference is not None:
-                board.push(move)
+    return score
+
+def _pending_losses(board: BaseBoard, color: Color) -> Bitboard:
+    """
+    Gets the pieces of *color* the opponent removes at the start of its
+    turn: bombarded pieces, then free captures around the remaining
+    infantry, chosen in the same order as the forced auto-captures.
+    """
+    lost = board.occupied_co[color] & board.bombarded_co[not color]
+    if not board.occupied_co[color] & ~lost & board.adjacent_infantry_squares_co[not color]:
+        return lost  # free captures only take pieces next to enemy infantry
+
+    occupied_co = [board.occupied_co[RED], board.occupied_co[BLUE]]
+    occupied_co[color] &= ~lost
+    all_units = board._all_infantry() & ~lost
+
+    hq_attacker_count = 0
+    for cluster in board._find_adjacency_clusters(occupied_co, all_units):
+        enemies, num_allowed = board._find_free_captures_for_cluster(occupied_co, cluster, not color)
+        num_allowed = popcount(num_allowed)
+        for square in scan_reversed(enemies & ~lost):
+            if num_allowed == 0:
                 break
+            if board.hq & BB_SQUARES[square]:
+                hq_attacker_count += 1 if num_allowed == 1 else 2
+                if hq_attacker_count <= 1:
+                    continue
+            lost |= BB_SQUARES[square]
+            num_allowed -= 1
+
+    return lost
+
+def _bombarded_after_losses(board: BaseBoard, color: Color, lost: Bitboard) -> Bitboard:
+    lost_artillery = lost & board._all_artillery()
+    if not lost_artillery:
+        return board.bombarded_co[color]
+
+    counts = board.bombard_counts_co[color]
+    for square in scan_reversed(lost_artillery):
+        counts = _bombard_counts_remove(counts, board._bombard_ray(square, board.piece_type_at(square)))
+    return counts[0] | counts[1] | counts[2] | counts[3]
+
+
+def evaluate_batch(boards: Iterable[BaseBoard]) -> "numpy.ndarray":
+    """
+    Scores many boards at once, returning a float64 array with the same
+    values as :func:`evaluate_board()` for each board. The piece
+    bitboards left after pending captures are unpacked into bit planes and
+    all boards are scored together with one matrix product per color.
+
+    Requires NumPy.
+    """
+    import numpy as np
+
+    # per board and color: the piece masks in PIECE_TYPES order, then the bombarded mask
+    masks: List[List[int]] = []
+    for board in boards:
+        row: List[int] = []
+        for color in COLORS:
+            lost = _pending_losses(board, color)
+            row.extend(board.pieces_mask(piece_type, color) & ~lost for piece_type in PIECE_TYPES)
+            row.append(_bombarded_after_losses(board, color, lost))
+        masks.append(row)
+
+    bitboards = np.array(masks, dtype="<u8").reshape(len(masks), len(COLORS), len(PIECE_TYPES) + 1)
+    # square i is bit i of the little-endian word
+    planes = np.unpackbits(bitboards.view(np.uint8), axis=-1, bitorder="little")
+    planes = planes.reshape(len(masks), len(COLORS), (len(PIECE_TYPES) + 1) * len(SQUARES)).astype(np.float64)
+
+    # the weights are integers, so the float64 sums are exact and match evaluate_board()
+    scores = [planes[:, index] @ np.array(_batch_weights(color), dtype=np.float64) for index, color in enumerate(COLORS)]
+    return (scores[RED] - scores[BLUE]) / PIECE_SQUARE_SCALE
+
+
+@functools.lru_cache(maxsize=None)
+def _batch_weights(color: Color) -> List[int]:
+    # the piece-square scores of every piece type, then the bombarded square scores
+    return [score for piece_type in PIECE_TYPES for score in PIECE_SQUARE_SCORES[color][piece_type]] + BOMBARDED_SQUARE_SCORES[color]
+
+
+def step(v2state: str, uci: Optional[str] = None) -> Dict[str, typing.Any]:
+    """
+    Decodes *v2state*, plays the move *uci* if given and describes the
+    resulting position, so that a caller across the Pyodide bridge needs a
+    single call per move.
+
+    Returns a dict of plain values with the keys ``v2state``, ``fen``,
+    ``legal_moves`` (UCI strings, in :func:`~BaseBoard.generate_legal_moves()`
+    order), ``turn`` (``"RED"`` or ``"BLUE"``) and ``outcome`` (``None``, or a
+    dict with ``termination`` and ``winner``).
+
+    :raises: :exc:`ValueError` if *uci* is not a legal move.
+    """
+    board = BaseBoard.deserialize(v2state)
+    if uci is not None:
+        move = Move.from_uci(uci)
+        if not board.is_legal(move):
+            raise ValueError(f"illegal move: {uci!r}")
+        board.push(move)
+
+    outcome = board.outcome()
+    return {
+        "v2state": board.serialize(),
+        "fen": board.board_fen(),
+        "legal_moves": [move.uci() for move in board.generate_legal_moves()],
+        "turn": COLOR_NAMES[board.turn].upper(),
+        "outcome": None if outcome is None else {
+            "termination": outcome.termination,
+            "winner": None if outcome.winner is None else COLOR_NAMES[outcome.winner].upper(),
+        },
+    }
+
+
+_STATS_METHODS = [
+    "generate_legal_moves", "generate_staged_moves", "generate_legal_moves_packed", "generate_staged_moves_packed", "count_legal_moves",
+    "push", "push_packed", "pop", "pop_packed", "copy", "is_legal", "outcome",
+    "_find_free_captures", "_find_adjacency_clusters", "get_bombarded_squares",
+    "serialize", "deserialize", "to_bytes", "from_bytes",
+]
+_STATS_FUNCTIONS = ["evaluate_board", "evaluate_batch"]
+
+_stats: Dict[str, List[float]] = {}
+_stats_originals: Dict[str, typing.Any] = {}
+
+
+def _timed(name: str, func: Callable) -> Callable:
+    entry = _stats.setdefault(name, [0, 0.0])
+    perf_counter = time.perf_counter
+
+    if inspect.isgeneratorfunction(func):
+        # time spent inside the generator, summed over all resumptions
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            entry[0] += 1
+            start = perf_counter()
+            it = func(*args, **kwargs)
+            entry[1] += perf_counter() - start
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    entry[1] += perf_counter() - start
+                    return
+                entry[1] += perf_counter() - start
+                yield item
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        entry[0] += 1
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            entry[1] += perf_counter() - start
+
+    return wrapper
+
+
+def enable_stats() -> None:
+    """
+    Starts counting calls and time spent in the hot paths of the engine,
+    see :func:`stats()`. Until this is called, the engine runs without any
+    instrumentation.
+    """
+    if _stats_originals:
+        return
+
+    for name in _STATS_METHODS:
+        original = BaseBoard.__dict__[name]
+        _stats_originals[name] = original
+        if isinstance(original, classmethod):
+            setattr(BaseBoard, name, classmethod(_timed(name, original.__func__)))
         else:
-            break
+            setattr(BaseBoard, name, _timed(name, original))
 
-    for piece_type in PIECE_VALUES:
-        pieces_mask = board.pieces_mask(piece_type, color)
-        num_pieces = popcount(pieces_mask)
-        score += PIECE_VALUES[piece_type] * num_pieces
-        for square in scan_reversed(pieces_mask):
-            multiplier = 1 if piece_type == ARTILLERY or piece_type == ARMORED_ARTILLERY or piece_type == HEAVY_ARTILLERY else 0.5
-            if piece_type == AIRBORNE_INFANTRY:
-                multiplier = -3
-            if piece_type == HQ:
-                multiplier = -0.2
-            score += POSITION_GRADIENTS[color][square] * multiplier
-
-    for square in scan_reversed(board.bombarded_co[color]):
-        score += POSITION_GRADIENTS[color][square] * 1
+    for name in _STATS_FUNCTIONS:
+        _stats_originals[name] = globals()[name]
+        globals()[name] = _timed(name, globals()[name])
 
-    return score
+
+def disable_stats() -> None:
+    """Removes the instrumentation installed by :func:`enable_stats()`, keeping the collected stats."""
+    for name, original in _stats_originals.items():
+        if name in _STATS_FUNCTIONS:
+            globals()[name] = original
+        else:
+            setattr(BaseBoard, name, original)
+    _stats_originals.clear()
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """
+    Returns the ``calls`` and inclusive ``time_ms`` per instrumented
+    function since the last :func:`reset_stats()`. Empty unless
+    :func:`enable_stats()` was called.
+    """
+    return {name: {"calls": int(calls), "time_ms": seconds * 1000} for name, (calls, seconds) in _stats.items() if calls}
+
+
+def reset_stats() -> None:
+    """Sets all counters and timers back to zero."""
+    for entry in _stats.values():
+        entry[0] = 0
+        entry[1] = 0.0
+
+
+def perft(board: BaseBoard, depth: int) -> int:
+    """
+    Counts the leaf nodes of the move tree *depth* moves deep.
+
+    Every pushed move counts as one ply, including forced auto-captures and
+    skips, so turn boundaries fall wherever the rules put them.
+    """
+    if depth <= 0:
+        return 1
+
+    if depth == 1:
+        return board.count_legal_moves()
+
+    nodes = 0
+    for move in board.generate_legal_moves_packed():
+        board.push_packed(move)
+        nodes += perft(board, depth - 1)
+        board.pop_packed()
+    return nodes
+
+
+def divide(board: BaseBoard, depth: int) -> Dict[str, int]:
+    """Returns the :func:`perft()` count below each legal move, keyed by UCI."""
+    result: Dict[str, int] = {}
+    for move in list(board.generate_legal_moves()):
+        board.push(move)
+        result[move.uci()] = perft(board, depth - 1)
+        board.pop()
+    return result
+
+
+def _board_from_args(position: str, moves: Iterable[str] = ()) -> BaseBoard:
+    board = BaseBoard(STARTING_FEN if position == "startpos" else position)
+    for uci in moves:
+        board.push(Move.from_uci(uci))
+    return board
+
+
+def _perft_suite_boards(path: str) -> Iterator[Tuple[dict, BaseBoard]]:
+    import json
+    import os
+
+    with open(path) as f:
+        suite = json.load(f)
+
+    for case in suite:
+        moves: List[str] = []
+        if "game" in case:
+            with open(os.path.join(os.path.dirname(path), case["game"])) as f:
+                moves = json.load(f)[:case["ply"]]
+        yield case, _board_from_args(case.get("fen", "startpos"), moves)
+
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(prog="python -m engine", description="GHQ engine command line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    perft_parser = commands.add_parser("perft", help="count move tree leaves from a position")
+    perft_parser.add_argument("fen", help='a FEN, or "startpos"')
+    perft_parser.add_argument("depth", type=int)
+    perft_parser.add_argument("--moves", nargs="*", default=[], help="UCI moves to play before counting")
+    perft_parser.add_argument("--divide", action="store_true", help="list leaf counts per root move")
+
+    suite_parser = commands.add_parser("perft-suite", help="check perft counts against known-good values")
+    suite_parser.add_argument(
+        "path", nargs="?",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "game", "tests", "testdata", "perft.json"),
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "perft":
+        board = _board_from_args(args.fen, args.moves)
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(board, args.depth)
+            for uci, count in counts.items():
+                print(f"{uci}: {count}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(board, args.depth)
+        elapsed = time.perf_counter() - start
+        print(f"\nnodes {nodes} time {elapsed:.3f}s nps {nodes / elapsed if elapsed else 0:.0f}")
+        return 0
+
+    if args.command == "perft-suite":
+        failures = 0
+        total_nodes = 0
+        start = time.perf_counter()
+        for case, board in _perft_suite_boards(args.path):
+            case_start = time.perf_counter()
+            nodes = perft(board, case["depth"])
+            elapsed = time.perf_counter() - case_start
+            total_nodes += nodes
+            ok = nodes == case["nodes"]
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {case['name']} depth {case['depth']}: {nodes} (expected {case['nodes']}) {elapsed:.3f}s")
+        elapsed = time.perf_counter() - start
+        print(f"\nnodes {total_nodes} time {elapsed:.3f}s nps {total_nodes / elapsed if elapsed else 0:.0f}")
+        return 1 if failures else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -34,36 +34,93 @@ export interface GameEngine {
   };
   RandomPlayer: (board: PythonBoard) => PythonPlayer;
   ValuePlayer: (board: PythonBoard) => PythonPlayer;
+  SearchPlayer: (
+    board: PythonBoard,
+    maxTimeMs?: number,
+    maxDepth?: number
+  ) => PythonPlayer;
+  step: (v2state: string, uci?: string) => PythonDict<StepResult>;
+  board_cache_info: () => PythonDict<{
+    hits: number;
+    misses: number;
+    size: number;
+    maxsize: number;
+  }>;
+  clear_board_cache: () => void;
+  enable_stats: () => void;
+  disable_stats: () => void;
+  stats: () => PythonDict<Record<string, { calls: number; time_ms: number }>>;
+  reset_stats: () => void;
+}
+
+export interface StepResult {
+  v2state: string;
+  fen: string;
+  legal_moves: string[];
+  turn: Player;
+  outcome?: { winner?: Player; termination: string };
 }
 
 export class GameV2 {
+  // The description of the last position seen. The boardgame.io flow asks
+  // about the same v2state several times per move, so this keeps it to a
+  // single call into the engine per position.
+  private last?: StepResult;
+  // The state that was described to produce `last`, when no move was played.
+  // Stored games still hold the legacy encoding, which the engine re-encodes
+  // to a different string, so `last.v2state` alone would never match it.
+  private lastInput?: string;
+
   constructor(private engine: GameEngine) {}
 
+  /**
+   * Decodes the state, optionally plays a move and describes the resulting
+   * position, all in a single call into the engine.
+   */
+  step(v2state: string, ghqMove?: AllowedMove): StepResult {
+    const uci = ghqMove ? allowedMoveToUci(ghqMove) : undefined;
+    const proxy = this.engine.step(v2state, uci);
+    try {
+      this.last = proxy.toJs({ dict_converter: Object.fromEntries });
+      this.lastInput = ghqMove ? undefined : v2state;
+      return this.last;
+    } finally {
+      proxy.destroy();
+    }
+  }
+
+  /**
+   * Describes the position, reusing the last result of {@link step} when it
+   * was for the same state, either as passed in or as re-encoded.
+   */
+  describe(v2state: string): StepResult {
+    if (
+      this.last &&
+      (this.last.v2state === v2state || this.lastInput === v2state)
+    ) {
+      return this.last;
+    }
+    return this.step(v2state);
+  }
+
   generateLegalMoves(v2state: string): AllowedMove[] {
-    const board = this.engine.BaseBoard.deserialize(v2state);
-    const moves = board.generate_legal_moves();
-    const ghqMoves = Array.from(moves).map((move) =>
-      allowedMoveFromUci(move.uci())
-    );
-    return ghqMoves;
+    return this.describe(v2state).legal_moves.map(allowedMoveFromUci);
   }
 
   isLegalMove(v2state: string, ghqMove: AllowedMove): boolean {
-    const board = this.engine.BaseBoard.deserialize(v2state);
-    const move = this.engine.Move.from_uci(allowedMoveToUci(ghqMove));
-    return board.is_legal(move);
+    return this.describe(v2state).legal_moves.includes(
+      allowedMoveToUci(ghqMove)
+    );
   }
 
   push(
     v2state: string,
     ghqMove: AllowedMove
   ): { boardState: BoardState; v2state: string } {
-    const board = this.engine.BaseBoard.deserialize(v2state);
-    const move = this.engine.Move.from_uci(allowedMoveToUci(ghqMove));
-    board.push(move);
+    const result = this.step(v2state, ghqMove);
     return {
-      boardState: FENtoBoardState(board.board_fen()),
-      v2state: board.serialize(),
+      boardState: FENtoBoardState(result.fen),
+      v2state: result.v2state,
     };
   }
 
@@ -79,35 +136,21 @@ export class GameV2 {
   }
 
   boardStates(v2state: string): { boardState: BoardState; v2state: string } {
-    const board = this.engine.BaseBoard.deserialize(v2state);
+    const result = this.describe(v2state);
     return {
-      boardState: FENtoBoardState(board.board_fen()),
-      v2state: board.serialize(),
+      boardState: FENtoBoardState(result.fen),
+      v2state: result.v2state,
     };
   }
 
   currentPlayerTurn(v2state: string): Player {
-    const board = this.engine.BaseBoard.deserialize(v2state);
-    return board.is_red_turn() ? "RED" : "BLUE";
+    return this.describe(v2state).turn;
   }
 
   getOutcome(
     v2state: string
   ): { winner?: Player; termination: string } | undefined {
-    const board = this.engine.BaseBoard.deserialize(v2state);
-    const outcome = board.outcome();
-    if (!outcome) {
-      return undefined;
-    }
-
-    let winner: Player | undefined;
-    if (outcome.winner === false) {
-      winner = "RED";
-    } else if (outcome.winner === true) {
-      winner = "BLUE";
-    }
-
-    return { winner, termination: outcome.termination };
+    return this.describe(v2state).outcome ?? undefined;
   }
 }
 
@@ -130,6 +173,13 @@ export interface PythonPlayer {
   get_next_move: () => PythonMove;
 }
 
+export interface PythonDict<T> {
+  toJs: (options: {
+    dict_converter: (entries: Iterable<[string, any]>) => any;
+  }) => T;
+  destroy: () => void;
+}
+
 export interface NewGameOptions {
   engine: GameEngine;
   fen?: string;
@@ -381,8 +431,7 @@ export function newGHQGameV2({
           throw new Error("v2state is not defined");
         }
 
-        const board = engine.BaseBoard.deserialize(G.v2state);
-        if (board.is_red_turn()) {
+        if (board.currentPlayerTurn(G.v2state) === "RED") {
           return [
             {
               move: "Skip",
@@ -391,7 +440,9 @@ export function newGHQGameV2({
           ];
         }
 
-        const player = engine.ValuePlayer(board);
+        const player = engine.ValuePlayer(
+          engine.BaseBoard.deserialize(G.v2state)
+        );
         // const start = Date.now();
         const move = player.get_next_move();
         // console.log(`Took ${Date.now() - start}ms`);
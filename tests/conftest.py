@@ -0,0 +1,28 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the engine is served as a single module from public/, not installed as a package
+sys.path.insert(0, os.path.join(ROOT_DIR, "public"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import engine  # noqa: E402
+
+
+@pytest.fixture
+def random_boards():
+    """Yields copies of the positions along random games, starting a new game whenever one ends."""
+    def boards(seed: int, n: int):
+        rng = random.Random(seed)
+        board = engine.BaseBoard()
+        for _ in range(n):
+            if board.is_game_over():
+                board = engine.BaseBoard()
+            board.push(rng.choice(list(board.generate_legal_moves())))
+            yield board.copy()
+
+    return boards
@@ -0,0 +1,37 @@
+"""
+evaluate_board() must not touch the board it scores, and evaluate_batch()
+must score every board exactly like it.
+"""
+
+import pytest
+
+import engine
+
+
+def test_evaluate_batch_matches_evaluate_board(random_boards):
+    pytest.importorskip("numpy")
+    boards = list(random_boards(0, 300))
+    assert list(engine.evaluate_batch(boards)) == [engine.evaluate_board(board) for board in boards]
+
+
+def test_evaluate_batch_empty():
+    pytest.importorskip("numpy")
+    assert len(engine.evaluate_batch([])) == 0
+
+
+def test_evaluate_board_leaves_the_board_unchanged(random_boards):
+    for board in random_boards(1, 200):
+        fen, ply = board.board_fen(), len(board.move_stack)
+        engine.evaluate_board(board)
+        assert (board.board_fen(), len(board.move_stack)) == (fen, ply)
+
+
+def test_piece_square_score_is_incremental(random_boards):
+    for board in random_boards(2, 300):
+        expected = [board._compute_piece_square_score(engine.RED), board._compute_piece_square_score(engine.BLUE)]
+        assert list(board.piece_square_co) == expected
+        move = next(iter(board.generate_legal_moves()), None)
+        if move is not None:
+            board.push(move)
+            board.pop()
+            assert list(board.piece_square_co) == expected
@@ -0,0 +1,59 @@
+"""
+Randomized differential test of BaseBoard.is_legal() against the move
+generator: every generated move must be accepted, and near-legal
+candidates made by perturbing one field must be judged the same way as
+membership in the generated set.
+"""
+
+import random
+from typing import Iterator, List
+
+import pytest
+
+import engine
+from engine import BaseBoard, Move
+
+MOVE_NAMES = ["Reinforce", "Move", "MoveAndOrient", "AutoCapture", "Skip"]
+
+
+def random_candidate_moves(legal: List[Move], rng: random.Random, n: int) -> Iterator[Move]:
+    # moves close to legal ones, so the validator has to get the details right
+    def square():
+        return rng.choice([None, rng.randrange(64)])
+
+    for _ in range(n):
+        move = rng.choice(legal).copy() if legal and rng.random() < 0.7 else Move(rng.choice(MOVE_NAMES))
+        field = rng.randrange(7)
+        if field == 0:
+            move.name = rng.choice(MOVE_NAMES)
+        elif field == 1:
+            move.from_square = square()
+        elif field == 2:
+            move.to_square = square()
+        elif field == 3:
+            move.unit_type = rng.choice([None] + engine.PIECE_TYPES)
+        elif field == 4:
+            move.orientation = rng.choice([None, rng.randrange(8)])
+        elif field == 5:
+            move.capture_preference = square()
+        else:
+            move.auto_capture_type = rng.choice([None, "bombard", "free"])
+        yield move
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_is_legal_matches_generator(seed: int) -> None:
+    rng = random.Random(seed)
+    board = BaseBoard()
+    mismatches = []
+    for _ in range(150):
+        legal = list(board.generate_legal_moves())
+        legal_set = set(legal)
+        for move in legal + list(random_candidate_moves(legal, rng, 20)):
+            expected = move in legal_set
+            if board.is_legal(move) != expected:
+                mismatches.append(f"{board.board_fen()}: {move!r} should be {'legal' if expected else 'illegal'}")
+        if board.outcome() is not None:
+            break
+        board.push(rng.choice(legal))
+    assert not mismatches, "\n".join(mismatches[:20])
@@ -0,0 +1,45 @@
+"""
+push_packed() and push() may be mixed on one board: the move stack only
+ever holds Move objects, and both pops take back exactly one move.
+"""
+
+import random
+
+import pytest
+
+from engine import BaseBoard, packed_move_uci
+
+
+def test_push_packed_keeps_move_stack_of_moves(random_boards):
+    rng = random.Random(0)
+    for board in random_boards(0, 200):
+        before = board.to_bytes(), [move.uci() for move in board.move_stack]
+        packed = rng.choice(board.generate_legal_moves_packed())
+
+        board.push_packed(packed)
+        assert [move.uci() for move in board.move_stack] == before[1]
+        assert board.peek().uci() == packed_move_uci(packed)
+        assert board.pop().uci() == packed_move_uci(packed)
+        assert (board.to_bytes(), [move.uci() for move in board.move_stack]) == before
+
+        board.push_packed(packed)
+        assert board.pop_packed() == packed
+        assert board.to_bytes() == before[0]
+
+
+def test_mixed_push_paths():
+    board = BaseBoard()
+    first = board.generate_legal_moves_packed()[0]
+    board.push_packed(first)
+    second = next(iter(board.generate_legal_moves()))
+    board.push(second)
+
+    assert [move.uci() for move in board.move_stack] == [second.uci()]
+    assert board.peek() is second
+    with pytest.raises(ValueError):
+        board.pop_packed()
+    assert board.pop() is second
+    assert board.pop_packed() == first
+    with pytest.raises(IndexError):
+        board.pop()
+
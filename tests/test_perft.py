@@ -0,0 +1,20 @@
+"""
+Move generator node counts for the positions in
+src/game/tests/testdata/perft.json, the suite behind
+``python -m engine perft-suite``.
+"""
+
+import os
+
+import pytest
+
+import engine
+
+PERFT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "game", "tests", "testdata", "perft.json")
+
+CASES = list(engine._perft_suite_boards(PERFT_PATH))
+
+
+@pytest.mark.parametrize("case, board", CASES, ids=[case["name"] for case, _ in CASES])
+def test_perft(case, board):
+    assert engine.perft(board, case["depth"]) == case["nodes"]
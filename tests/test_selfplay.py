@@ -0,0 +1,22 @@
+"""
+The selfplay harness must give the same games whatever the pool size,
+since every game seeds the RNG from its own index.
+"""
+
+import engine
+from selfplay import selfplay
+
+
+def test_selfplay_is_independent_of_pool_size():
+    serial = selfplay(engine.RandomPlayer, engine.RandomPlayer, games=4, processes=1, seed=7, max_plies=120)
+    pooled = selfplay(engine.RandomPlayer, engine.RandomPlayer, games=4, processes=2, seed=7, max_plies=120)
+    assert serial == pooled
+    assert [game.first_is_red for game in serial] == [True, False, True, False]
+
+
+def test_selfplay_draws_at_max_plies():
+    games = selfplay(engine.RandomPlayer, engine.RandomPlayer, games=2, processes=1, max_plies=1)
+    for game in games:
+        assert game.plies == 1
+        assert (game.termination, game.winner) == ("max plies", None)
+        assert game.first_score() == 0.5
@@ -0,0 +1,89 @@
+"""
+Round trips through the binary state format, and decoding of the older
+zlib format that stored games still contain.
+"""
+
+import base64
+import json
+import os
+import struct
+import zlib
+
+import pytest
+
+import engine
+from engine import BLUE, RED, BaseBoard, Move
+
+GAME1_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "game", "tests", "testdata", "game1.json")
+
+# game1.json after 40 plies, as written by the zlib serializer before the binary format existed
+GAME1_PLY_40_LEGACY = (
+    "eJxzZhVjdGxQSmJgZGNgaFBQcmBhgAIBBkYgycTAwOgAEwLxoIARQjmA1DkA9TuzsjEywiQdHBkYWDgYwAICGgINCZ9Kl/rxszMxIkxggpIOYPOZkEzG"
+    "DiCGgxzHjOYWkAQrwkVgGooByN4Jtw=="
+)
+
+
+def legacy_serialize(board: BaseBoard) -> str:
+    packed = struct.pack(
+        ">21Q3b12I2b",
+        board.occupied, board.infantry, board.armored_infantry, board.airborne_infantry,
+        board.artillery, board.armored_artillery, board.heavy_artillery, board.hq,
+        board.occupied_co[RED], board.occupied_co[BLUE],
+        board.bombarded_co[RED], board.bombarded_co[BLUE],
+        board.adjacent_infantry_squares_co[RED], board.adjacent_infantry_squares_co[BLUE],
+        board.orientation_bit0, board.orientation_bit1, board.orientation_bit2,
+        board.turn_pieces, board.free_capture_clusters, board.free_capture_enemies, board.free_capture_num_allowed,
+        board.turn, board.turn_moves, board.turn_auto_moves,
+        *board.reserves[RED].to_ints(), *board.reserves[BLUE].to_ints(),
+        board.did_offer_draw, board.did_accept_draw,
+    )
+    return base64.b64encode(zlib.compress(packed)).decode()
+
+
+def state(board: BaseBoard) -> tuple:
+    # move generation goes first, it may set up free captures before the lazily built hash exists
+    return (
+        sorted(move.uci() for move in board.generate_legal_moves()),
+        board.board_fen(), board.turn, board.turn_moves, board.turn_auto_moves, board.turn_pieces,
+        board.free_capture_clusters, board.free_capture_enemies, board.free_capture_num_allowed,
+        board.did_offer_draw, board.did_accept_draw,
+        list(board.bombarded_co), list(board.bombard_counts_co), list(board.adjacent_infantry_squares_co),
+        board.zobrist_hash(), engine.evaluate_board(board),
+    )
+
+
+def test_bytes_round_trip(random_boards):
+    for board in random_boards(0, 300):
+        decoded = BaseBoard.from_bytes(board.to_bytes())
+        assert state(decoded) == state(board)
+        assert decoded.to_bytes() == board.to_bytes()
+
+
+def test_serialize_round_trip(random_boards):
+    engine.clear_board_cache()
+    for board in random_boards(1, 100):
+        assert state(BaseBoard.deserialize(board.serialize())) == state(board)
+
+
+def test_deserialize_legacy_format(random_boards):
+    engine.clear_board_cache()
+    for board in random_boards(2, 100):
+        assert state(BaseBoard.deserialize(legacy_serialize(board))) == state(board)
+
+
+def test_deserialize_stored_legacy_state():
+    board = BaseBoard()
+    with open(GAME1_PATH) as f:
+        for uci in json.load(f)[:40]:
+            board.push(Move.from_uci(uci))
+
+    decoded = BaseBoard.deserialize(GAME1_PLY_40_LEGACY)
+    assert state(decoded) == state(board)
+    assert (decoded.turn, decoded.turn_moves) == (BLUE, 1)
+
+
+def test_from_bytes_rejects_bad_data():
+    data = BaseBoard().to_bytes()
+    for bad in (b"", bytes([0]) + data[1:], data[:-1], data + b"\0"):
+        with pytest.raises(ValueError):
+            BaseBoard.from_bytes(bad)
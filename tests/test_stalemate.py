@@ -0,0 +1,69 @@
+"""
+Differential test of BaseBoard._has_non_skip_move(), which outcome() and
+the search use to detect stalemates, against any(generate_legal_moves()).
+Skips are falsy moves, so any() is false exactly when skipping is the
+only option.
+"""
+
+import random
+
+import pytest
+
+from engine import BaseBoard
+
+ARROWS = "↑↗→↘↓↙←↖"
+
+# the red HQ is boxed in by blue and has nothing in reserve
+STALEMATE_FEN = "8/8/8/8/8/8/iq6/Qi6 - - r"
+
+
+def crowded_fen(rng: random.Random) -> str:
+    # both HQs and a few more pieces packed into a small window, so some pieces cannot move
+    size = rng.choice([2, 3, 3, 4, 8])
+    file0, rank0 = rng.randrange(9 - size), rng.randrange(9 - size)
+    window = [(rank0 + rank) * 8 + file0 + file for rank in range(size) for file in range(size)]
+
+    cells = {}
+    for i, square in enumerate(rng.sample(window, rng.randrange(2, min(len(window), 9) + 1))):
+        symbol = "q" if i < 2 else rng.choice("iiifprth")
+        if (i if i < 2 else rng.randrange(2)) == 0:
+            symbol = symbol.upper()
+        if symbol.lower() in "rth":
+            symbol += rng.choice(ARROWS)
+        cells[square] = symbol
+
+    ranks = []
+    for rank in range(7, -1, -1):
+        row, empty = "", 0
+        for file in range(8):
+            symbol = cells.get(rank * 8 + file)
+            if symbol is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += symbol
+        ranks.append(row + (str(empty) if empty else ""))
+    return f"{'/'.join(ranks)} {rng.choice(['-', '-', 'I'])} {rng.choice(['-', '-', 'i'])} {rng.choice('rb')}"
+
+
+def test_stalemate_position():
+    board = BaseBoard(STALEMATE_FEN)
+    assert [move.uci() for move in board.generate_legal_moves()] == ["skip"]
+    assert not board._has_non_skip_move()
+    assert board.outcome().termination == "stalemate"
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_has_non_skip_move_crowded(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        fen = crowded_fen(rng)
+        board = BaseBoard(fen)
+        assert board._has_non_skip_move() == any(board.generate_legal_moves()), fen
+
+
+def test_has_non_skip_move_in_games(random_boards):
+    for board in random_boards(0, 300):
+        assert board._has_non_skip_move() == any(board.generate_legal_moves()), board.board_fen()
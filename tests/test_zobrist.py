@@ -0,0 +1,54 @@
+"""
+The incrementally updated zobrist hash must always match a hash computed
+from scratch, since the transposition table and the outcome cache are
+keyed by it.
+"""
+
+import random
+
+from engine import BaseBoard, PACKED_FREE_CAPTURE
+
+
+def assert_hash_matches(board: BaseBoard) -> None:
+    board.zobrist_hash()  # builds the hash of a decoded board
+    assert board._zobrist == board._compute_zobrist()
+    for reserve in board.reserves:
+        assert reserve._zobrist == reserve._compute_zobrist()
+
+
+def test_zobrist_is_incremental(random_boards):
+    rng = random.Random(0)
+    free_captures = 0
+    for board in random_boards(0, 300):
+        assert_hash_matches(board)
+        key = board.zobrist_hash()
+
+        move = rng.choice(list(board.generate_legal_moves()))
+        board.push(move)
+        assert_hash_matches(board)
+        board.pop()
+        assert board.zobrist_hash() == key
+
+        for packed in board.generate_legal_moves_packed():
+            free_captures += packed & 7 == PACKED_FREE_CAPTURE
+            board.push_packed(packed)
+            assert_hash_matches(board)
+            board.pop_packed()
+            assert board.zobrist_hash() == key
+
+    assert free_captures
+
+
+def test_zobrist_after_decoding(random_boards):
+    rng = random.Random(1)
+    for board in random_boards(1, 200):
+        decoded = BaseBoard.from_bytes(board.to_bytes())
+        assert decoded.zobrist_hash() == board.zobrist_hash()
+
+        # pushing onto a decoded board builds the hash first, then updates it
+        decoded = BaseBoard.from_bytes(board.to_bytes())
+        move = rng.choice(list(decoded.generate_legal_moves()))
+        decoded.push(move)
+        assert_hash_matches(decoded)
+        decoded.pop()
+        assert decoded.zobrist_hash() == board.zobrist_hash()